@@ -0,0 +1,91 @@
+import asyncio
+from typing import AsyncIterator, Iterable, Tuple
+
+from AsyncOrder import AsyncOrder
+from AsyncUser import AsyncUser
+from async_models import AsyncWarframeMarketCore
+from models import logger
+
+
+class AsyncMarket(AsyncWarframeMarketCore):
+    def __init__(self, user: AsyncUser):
+        super(AsyncMarket, self).__init__(session=user.session, platform=user.platform, language=user.language)
+        self.user = user
+        logger.debug('AsyncMarket instance initialized')
+
+    async def get_item_data(self, item: str) -> dict:
+        logger.info('Getting data for item: %s', item)
+        url_name = self.resolve_item(item)
+        if url_name is None:
+            return None
+        url = self._build_url('items', url_name)
+        return self._json(await self._get(url), 200)
+
+    async def get_item_orders(self, item: str) -> dict:
+        logger.info('Getting orders for item: %s', item)
+        url_name = self.resolve_item(item)
+        if url_name is None:
+            return None
+        url = self._build_url('items', url_name, 'orders')
+        return self._json(await self._get(url), 200)
+
+    async def get_item_statistics(self, item: str) -> dict:
+        logger.info('Getting statistics for item: %s', item)
+        url_name = self.resolve_item(item)
+        if url_name is None:
+            return None
+        url = self._build_url('items', url_name, 'statistics')
+        return self._json(await self._get(url), 200)
+
+    async def get_all_items_data(self) -> dict:
+        logger.info('Getting data for all items')
+        url = self._build_url('items')
+        return self._json(await self._get(url), 200)
+
+    async def get_all_ducat_data(self) -> dict:
+        logger.info('Getting ducat data for all items')
+        url = self._build_url('tools', 'ducats')
+        return self._json(await self._get(url), 200)
+
+    async def get_market_statistics(self) -> dict:
+        logger.info('Getting global market statistics')
+        url = self._build_url('statistics')
+        return self._json(await self._get(url), 200)
+
+    async def get_most_recent_orders(self) -> dict:
+        """Get the 500 most recent orders. Updates every 3 minutes."""
+        logger.info('Getting the most recent orders')
+        url = self._build_url('most_recent')
+        return self._json(await self._get(url), 200)
+
+    async def place_new_order(self, item_id: str, order_type: str, platinum: int, quantity: int, visible: bool = True) -> AsyncOrder:
+        return await AsyncOrder(self.user).new(item_id, order_type, platinum, quantity, visible)
+
+    async def get_order_by_id(self, order_id: str, username: str = None) -> dict:
+        if username is None or username == self.user.username:
+            return await self.user.get_order_by_id(order_id)
+        return await AsyncUser(username, self.user.platform, self.user.region).get_order_by_id(order_id)
+
+    async def gather_item_orders(self, items: Iterable[str], concurrency: int = 16, return_exceptions: bool = False) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Fetch the orders of many items with at most `concurrency` requests in flight.
+        Yields (item, orders) pairs in completion order; with return_exceptions the exception is yielded in place of the orders.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(item: str):
+            async with semaphore:
+                try:
+                    return item, await self.get_item_orders(item)
+                except Exception as exc:
+                    if not return_exceptions:
+                        raise
+                    return item, exc
+
+        tasks = [asyncio.ensure_future(fetch(item)) for item in items]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
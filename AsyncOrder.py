@@ -0,0 +1,79 @@
+import logging
+
+from AsyncUser import AsyncUser
+from Order import Order
+from async_models import AsyncWarframeMarketCore
+from models import logger
+
+
+class AsyncOrder(AsyncWarframeMarketCore):
+    """Async counterpart of Order. Use ``await AsyncOrder.fetch(user, order_id)`` to load an existing order."""
+
+    _set_fields = Order._set_fields
+    __str__ = Order.__str__
+
+    def __init__(self, user: AsyncUser, order_id: str = '', order_json: dict = None):
+        super(AsyncOrder, self).__init__(session=user.session, platform=user.platform, language=user.language)
+        self.user = user
+        self.order_id = order_id
+        self._set_fields(order_json or {})
+
+    @classmethod
+    async def fetch(cls, user: AsyncUser, order_id: str) -> 'AsyncOrder':
+        return cls(user, order_id, await user.get_order_by_id(order_id))
+
+    async def new(self, item_id: str, order_type: str, platinum: int, quantity: int, visible: bool = True):
+        if self.order_id != '':
+            logger.warning('Tried to create a new order when it already exists')
+            return self
+
+        logger.info('Placing a new %s order of %s x%s for %sp each and visible %s', order_type, item_id, quantity, platinum, visible)
+        self.item_id = item_id
+        self.order_type = order_type
+        self.platinum = platinum
+        self.quantity = quantity
+        self.visible = visible
+        self.item_name = self.get_item_name_by_id(item_id)
+
+        url = self._build_url('profile', 'orders')
+        payload = {
+            'order_type': self.order_type,
+            'item_id': self.item_id,
+            'platinum': self.platinum,
+            'quantity': self.quantity,
+            'visible': self.visible
+        }
+        result = self._json(await self._post(url, payload), 200, strict=self.raise_errors)
+        if result:
+            self.order_id = result['order']['id']
+            self._set_fields(result['order'])
+        return self
+
+    async def change(self, item_id: str = None, platinum: int = None, quantity: int = None, visible: bool = None):
+        if item_id is None:
+            item_id = self.order_json['item']['id']
+        if platinum is None:
+            platinum = self.order_json['platinum']
+        if quantity is None:
+            quantity = self.order_json['quantity']
+        if visible is None:
+            visible = self.order_json['visible']
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Changing %s order %s to %s x%s for %sp each and visible %s for a total of %sp', self.order_type, self.order_id, self.item_name, quantity, platinum, visible, quantity * platinum)
+        url = self._build_url('profile', 'orders', self.order_id)
+        payload = {
+            'item_id': item_id,
+            'platinum': platinum,
+            'quantity': quantity,
+            'visible': visible
+        }
+        result = self._json(await self._put(url, payload), 200, strict=self.raise_errors)
+        if result:
+            self._set_fields(result['order'])
+        return self
+
+    async def delete(self) -> dict:
+        logger.info('Deleting %s order %s: %s x%s for %sp each and visible %s', self.order_type, self.order_id, self.item_name, self.quantity, self.platinum, self.visible)
+        url = self._build_url('profile', 'orders', self.order_id)
+        return self._json(await self._delete(url), 200, strict=self.raise_errors)
@@ -0,0 +1,45 @@
+from async_models import AsyncWarframeMarketCore
+from models import logger
+
+
+class AsyncUser(AsyncWarframeMarketCore):
+    def __init__(self, username: str, platform: str = 'pc', region: str = 'en', session=None):
+        super(AsyncUser, self).__init__(session=session, platform=platform, language=region)
+        self.username = username
+        self.region = region
+        self.orders_json = {}
+
+    async def get_profile(self) -> dict:
+        logger.info('Getting info for profile: %s', self.username)
+        url = self._build_url('profile', self.username)
+        return self._json(await self._get(url), 200)
+
+    async def get_orders(self, force=False):
+        if self.orders_json and not force:
+            return self.orders_json
+        logger.info('Getting orders for profile: %s', self.username)
+        url = self._build_url('profile', self.username, 'orders')
+        self.orders_json = self._json(await self._get(url), 200)
+        return self.orders_json
+
+    async def get_statistics(self) -> dict:
+        logger.info('Getting statistics for profile: %s', self.username)
+        url = self._build_url('profile', self.username, 'statistics')
+        return self._json(await self._get(url), 200)
+
+    async def get_achievements(self) -> dict:
+        logger.info('Getting achievements for profile: %s', self.username)
+        url = self._build_url('profile', self.username, 'achievements')
+        return self._json(await self._get(url), 200)
+
+    async def get_reviews(self) -> dict:
+        logger.info('Getting reviews for profile: %s', self.username)
+        url = self._build_url('profile', self.username, 'reviews')
+        return self._json(await self._get(url), 200)
+
+    async def get_order_by_id(self, order_id: str) -> dict:
+        await self.get_orders()
+        for order_type, orders in self.orders_json.items():
+            for order in orders:
+                if order['id'] == order_id:
+                    return order
@@ -1,10 +1,21 @@
-import ast
 import json
+import time
+from collections import namedtuple
+from typing import TYPE_CHECKING
 
+import exceptions
 import utility
 from Order import Order
 from User import User
-from models import WarframeMarketCore, logger
+from models import DUCAT_DATA_JSON, DUCAT_DATA_TABLE, DUCAT_DATA_TTL, ITEM_DATA_JSON, ITEM_DATA_TABLE, WarframeMarketCore, diff_reference, logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from history import PriceHistory
+    from repricer import RepriceRules
+
+
+BatchResult = namedtuple('BatchResult', ['key', 'ok', 'result', 'error'])
 
 
 class SearchConstraints:
@@ -18,79 +29,344 @@ class SearchConstraints:
 
 
 class Market(WarframeMarketCore):
-    def __init__(self, user: User):
-        super(Market, self).__init__()
+    def __init__(self, user: User, history: 'PriceHistory' = None):
+        super(Market, self).__init__(session=user.session, platform=user.platform, language=user.language)
         self.logger = utility.validate_logger(logger)
         self.user = user
-
-        self._load_item_data()
-        self._load_mod_data()
-        self.update_ducat_data()
+        # When set, fetched statistics and order snapshots are also appended to this store
+        self.history = history
 
         self.logger.debug('Market instance initialized')
 
     def get_item_data(self, item: str) -> dict:
-        self.logger.info(f'Getting data for item: {item}')
-        url = self._build_url('items', item, normalize=True)
+        self.logger.info('Getting data for item: %s', item)
+        url_name = self.resolve_item(item)
+        if url_name is None:
+            return None
+        url = self._build_url('items', url_name)
         return self._json(self._get(url), 200)
 
     def get_item_orders(self, item: str) -> dict:
-        self.logger.info(f'Getting orders for item: {item}')
-        url = self._build_url('items', item, 'orders', normalize=True)
-        return self._json(self._get(url), 200)
+        self.logger.info('Getting orders for item: %s', item)
+        url_name = self.resolve_item(item)
+        if url_name is None:
+            return None
+        url = self._build_url('items', url_name, 'orders')
+        payload = self._json(self._get(url), 200)
+        if payload and self.history is not None:
+            self.history.ingest_orders(payload['orders'], item=url_name)
+        return payload
 
     def get_item_statistics(self, item: str) -> dict:
-        self.logger.info(f'Getting statistics for item: {item}')
-        url = self._build_url('items', item, 'statistics', normalize=True)
-        return self._json(self._get(url), 200)
+        self.logger.info('Getting statistics for item: %s', item)
+        url_name = self.resolve_item(item)
+        if url_name is None:
+            return None
+        url = self._build_url('items', url_name, 'statistics')
+        payload = self._json(self._get(url), 200)
+        if payload and self.history is not None:
+            self.history.ingest_statistics(url_name, payload)
+        return payload
+
+    def get_item_statistics_frame(self, items: list, source: str = 'closed', period: str = '90days', concurrency: int = 8) -> 'pd.DataFrame':
+        """
+        Fetch the statistics of many items concurrently and return them as one long table sorted by item, order type and datetime.
+        source is 'closed' or 'live', period '48hours' or '90days'. mod_rank is a nullable integer, missing for non-mod items,
+        order_type is buy/sell for live statistics and missing for closed ones.
+        """
+        import numpy as np
+        import pandas as pd
+
+        items = list(items)
+        price_columns = ('min_price', 'max_price', 'avg_price', 'wa_price', 'median')
+        columns = {name: [] for name in ('item', 'datetime', 'volume', 'mod_rank', 'order_type') + price_columns}
+        for item, payload, exception in utility.map_concurrently(self.get_item_statistics, items, concurrency):
+            if exception is not None or not payload:
+                self.logger.warning('Could not get statistics for %s: %s', item, exception)
+                continue
+            statistics = payload[f'statistics_{source}'][period]
+            columns['item'].extend([item] * len(statistics))
+            for name in ('datetime', 'volume', 'mod_rank', 'order_type') + price_columns:
+                columns[name].extend([statistic.get(name) for statistic in statistics])
 
-    def get_all_items_data(self) -> dict:
-        self.logger.info(f'Getting data for all items')
+        frame = pd.DataFrame({
+            'item': pd.Categorical(columns['item'], categories=list(dict.fromkeys(items))),
+            'datetime': pd.to_datetime(columns['datetime'], utc=True),
+            'volume': np.array(columns['volume'], dtype=np.int64),
+            'mod_rank': pd.array(columns['mod_rank'], dtype='Int8'),
+            'order_type': pd.Categorical(columns['order_type'], categories=['buy', 'sell']),
+        })
+        for name in price_columns:
+            frame[name] = np.array(columns[name], dtype=np.float64)
+        return frame.sort_values(['item', 'order_type', 'datetime'], kind='stable', ignore_index=True)
+
+    def get_all_items_data(self, revalidate: bool = False) -> dict:
+        self.logger.info('Getting data for all items')
         url = self._build_url('items')
-        return self._json(self._get(url), 200)
+        return self._json(self._get(url, revalidate=revalidate), 200)
 
-    def get_all_ducat_data(self) -> dict:
-        self.logger.info(f'Getting ducat data for all items')
+    def get_all_ducat_data(self, revalidate: bool = False) -> dict:
+        self.logger.info('Getting ducat data for all items')
         url = self._build_url('tools', 'ducats')
-        return self._json(self._get(url), 200)
+        return self._json(self._get(url, revalidate=revalidate), 200)
 
     def get_market_statistics(self) -> dict:
-        self.logger.info(f'Getting global market statistics')
+        self.logger.info('Getting global market statistics')
         url = self._build_url('statistics')
         return self._json(self._get(url), 200)
 
     def get_most_recent_orders(self) -> dict:
         """Get the 500 most recent orders. Updates every 3 minutes."""
-        self.logger.info(f'Getting the most recent orders')
+        self.logger.info('Getting the most recent orders')
         url = self._build_url('most_recent')
-        return self._json(self._get(url), 200)
+        payload = self._json(self._get(url), 200)
+        if payload and self.history is not None:
+            self.history.ingest_orders(payload['orders'])
+        return payload
 
     def get_site_user_statistics(self) -> dict:
-        websocket = self._open_ws(platform=self.user.platform)
-        return ast.literal_eval(websocket.recv())['payload']
+        from websocket_manager import ONLINE_COUNT
+
+        return self._websocket().wait_for(ONLINE_COUNT)
+
+    def stream_order_books(self, items: list = None):
+        """Start and return an OrderBookFeed keeping live order books of items (every announced item if None)."""
+        from orderbook import OrderBookFeed
+
+        return OrderBookFeed(self, items).start()
+
+    def schedule_polling(self, items: list = None, budget: float = 1.0, source: str = 'orders', **options):
+        """Start and return a PollScheduler refreshing items (the whole catalogue if None) within budget requests per second."""
+        from scheduler import PollScheduler
+
+        return PollScheduler(self, items, budget, source, **options).start()
+
+    def scan_catalogue(self, items: list = None, processes: int = None, budget: float = None, **options) -> 'pd.DataFrame':
+        """
+        Summarise the order books of items (the whole catalogue if None) with a process pool, one row per item.
+        budget is the request rate of each worker process (None splits this process' rate limits between them), see
+        scanner.CatalogueScanner for the other options.
+        """
+        from scanner import CatalogueScanner
+
+        return CatalogueScanner(self, items, processes, budget=budget, **options).to_frame()
 
     def place_new_order(self, item_id: str, order_type: str, platinum: int, quantity: int, visible: bool = True) -> Order:
         """Place a new order and return the JSON of placed order."""
-        return Order(self.user.username).new(item_id, order_type, platinum, quantity, visible)
+        return Order(self.user).new(item_id, order_type, platinum, quantity, visible)
+
+    def _run_batch(self, operation, keys, concurrency: int) -> list:
+        report = []
+        for key, result, error in utility.map_concurrently(operation, keys, concurrency):
+            if error is not None:
+                self.logger.warning('Batch operation on %s failed: %s', key, error)
+            report.append(BatchResult(key, error is None, result, error))
+        return report
+
+    def _user_order(self, order_id: str) -> Order:
+        order = Order(self.user, order_id)
+        if not order.order_json:
+            raise exceptions.WarframeMarketException(f'Order {order_id} not found for user {self.user.username}')
+        order.raise_errors = True
+        return order
+
+    def place_orders(self, orders: list, concurrency: int = 8) -> list:
+        """
+        Place many orders concurrently. Each order is a dict of place_new_order's arguments.
+        Returns a BatchResult per order keyed by its index in orders, with the placed order JSON or the error.
+        """
+        def place(index: int) -> dict:
+            order = Order(self.user)
+            order.raise_errors = True
+            return order.new(**orders[index]).order_json
+
+        return sorted(self._run_batch(place, range(len(orders)), concurrency))
+
+    def reprice_orders(self, prices: dict, concurrency: int = 8) -> list:
+        """Change the platinum price of many of the user's orders concurrently, prices maps order id to the new price."""
+        self.user.get_orders()
+        return self._run_batch(lambda order_id: self._user_order(order_id).change(platinum=prices[order_id]).order_json, prices, concurrency)
+
+    def auto_reprice(self, rules: 'RepriceRules' = None, dry_run: bool = True, concurrency: int = 8) -> tuple:
+        """
+        Reprice the user's listings against the live order books following rules (see repricer.RepriceRules).
+        Returns (plan, results): the per listing diff and, unless dry_run, the BatchResults of the changed listings.
+        """
+        from repricer import Repricer
+
+        repricer = Repricer(self, rules, concurrency)
+        plan = repricer.plan()
+        return plan, ([] if dry_run else repricer.apply(plan))
+
+    def delete_orders(self, order_ids: list, concurrency: int = 8) -> list:
+        """Delete many of the user's orders concurrently, returning a BatchResult per order id."""
+        self.user.get_orders()
+        return self._run_batch(lambda order_id: self._user_order(order_id).delete(), order_ids, concurrency)
 
     def get_order_by_id(self, order_id: str, username: str = None) -> dict:
         if username is None:
             username = self.user.username
-        return User(username).get_order_by_id(order_id)
+        if username == self.user.username:
+            return self.user.get_order_by_id(order_id)
+        return User(username, self.user.platform, self.user.region).get_order_by_id(order_id)
 
     def update_ducat_data(self) -> None:
-        with open('ducat_data.json', 'w+') as file:
-            json.dump(self.get_all_ducat_data(), file)
-        self.logger.info(f'Updated ducat data')
+        import refdata
+
+        ducat_data = self.get_all_ducat_data()
+        with open(DUCAT_DATA_JSON, 'w+') as file:
+            json.dump(ducat_data, file)
+        refdata.compile_ducat_data(DUCAT_DATA_TABLE, ducat_data['previous_hour'], refdata.payload_version(ducat_data))
+        self.logger.info('Updated ducat data')
         self._load_ducat_data()
+        self.reference.ducat_data = ducat_data
+
+    def _refresh_ducat_data(self) -> None:
+        """Map the compiled ducat table when it is younger than DUCAT_DATA_TTL, so processes share one download, otherwise download it."""
+        import refdata
+
+        try:
+            created = refdata.ReferenceTable(DUCAT_DATA_TABLE).created
+        except (OSError, ValueError):
+            created = None
+        if created is not None and time.time() - created < DUCAT_DATA_TTL:
+            self._load_ducat_data()
+        else:
+            self.update_ducat_data()
 
     def update_item_data(self) -> None:
-        with open('item_data.json', 'w+') as file:
-            json.dump(self.get_all_items_data(), file)
-        self.logger.info(f'Updated item data')
+        import refdata
+
+        item_data = self.get_all_items_data()
+        with open(ITEM_DATA_JSON, 'w+') as file:
+            json.dump(item_data, file)
+        refdata.compile_item_data(ITEM_DATA_TABLE, item_data['items']['en'], refdata.payload_version(item_data))
+        self.logger.info('Updated item data')
         self._load_item_data()
 
+    def refresh_ducat_data(self) -> list:
+        """
+        Revalidate the ducat data and patch the loaded indexes with only the rows that changed.
+        Returns the ReferenceChanges, which are also sent to subscribe_reference_changes listeners.
+        """
+        import refdata
+
+        ducat_data = self.get_all_ducat_data(revalidate=True)
+        new_rows = {row['item']: (row['ducats'], row['ducats_per_platinum_wa']) for row in ducat_data['previous_hour']}
+        with self.reference.lock:
+            changes = diff_reference('ducats', self._ducat_rows(), new_rows)
+            if not changes:
+                self.logger.debug('Ducat data is unchanged')
+                return changes
+
+            self._patch_ducat_data(changes)
+            with open(DUCAT_DATA_JSON, 'w+') as file:
+                json.dump(ducat_data, file)
+            refdata.compile_ducat_data(DUCAT_DATA_TABLE, ducat_data['previous_hour'], refdata.payload_version(ducat_data))
+            # Only re-map the published file so reload_reference_data() doesn't see it as stale, the frame is already patched
+            self.reference.ducat_table = refdata.ReferenceTable(DUCAT_DATA_TABLE)
+            self.reference.ducat_data = ducat_data
+
+        self.logger.info('Refreshed ducat data: %s changed rows', len(changes))
+        self._emit_reference_changes(changes)
+        return changes
+
+    def refresh_item_data(self) -> list:
+        """
+        Revalidate the item list, republish the compiled table and rebind the loaded item_data mapping in place.
+        Response cache entries of renamed or removed items are invalidated. Returns the ReferenceChanges.
+        """
+        import refdata
+
+        item_data = self.get_all_items_data(revalidate=True)
+        new_names = {item['id']: item['url_name'] for item in item_data['items']['en']}
+        with self.reference.lock:
+            changes = diff_reference('items', dict(self.item_data), new_names)
+            if not changes:
+                self.logger.debug('Item data is unchanged')
+                return changes
+
+            with open(ITEM_DATA_JSON, 'w+') as file:
+                json.dump(item_data, file)
+            refdata.compile_item_data(ITEM_DATA_TABLE, item_data['items']['en'], refdata.payload_version(item_data))
+            table = refdata.ReferenceTable(ITEM_DATA_TABLE)
+            self.reference.item_table = table
+            self.item_data.rebind(table)
+            self.reference.name_index = None
+
+        if self.response_cache is not None:
+            for change in changes:
+                if change.old is not None:
+                    self.response_cache.invalidate(self._build_url('items', change.old))
+        self.logger.info('Refreshed item data: %s changed rows', len(changes))
+        self._emit_reference_changes(changes)
+        return changes
+
+    def find_ducat_deals(self, constraints: SearchConstraints, concurrency: int = 8, statuses: tuple = ('ingame',)) -> 'pd.DataFrame':
+        """
+        Find sell orders worth buying for ducats, ranked by ducats per platinum.
+        Candidates come from the hourly ducat data, their live orders are fetched concurrently and filtered in one vectorised pass.
+        """
+        import numpy as np
+        import pandas as pd
+        from records import OrderTable
+
+        ducat_df = self.ducat_data_df
+        candidates = ducat_df.loc[
+            (ducat_df['dpp'].to_numpy() >= constraints.min_ducat_data_ratio)
+            & (ducat_df['ducats'].to_numpy() >= constraints.min_ducats)
+            & (ducat_df['ducats'].to_numpy() <= constraints.max_ducats),
+            'id'
+        ]
+        item_data = self.item_data
+        url_names = {item_data[item_id]: item_id for item_id in candidates if item_id in item_data}
+        self.logger.info('Searching ducat deals in %s candidate items', len(url_names))
+
+        tables = []
+        for url_name, payload, exception in utility.map_concurrently(self.get_item_orders, url_names, concurrency):
+            if exception is not None or not payload:
+                self.logger.warning('Could not get orders for %s: %s', url_name, exception)
+                continue
+            tables.append(OrderTable.from_orders(payload['orders'], url_names[url_name]))
+
+        orders = OrderTable.concat(tables)
+        orders = orders.take(orders.is_type('sell') & orders.has_status(*statuses))
+        table = pd.DataFrame({
+            'item_id': orders.item_ids,
+            'order_id': orders.ids,
+            'user': orders.users,
+            'platinum': orders.platinum.astype(np.int64),
+            'quantity': orders.quantity.astype(np.int64),
+        })
+        table['ducats'], _ = self.get_ducat_data_by_ids(orders.item_ids)
+        table['ratio'] = table['ducats'].to_numpy() / table['platinum'].to_numpy()
+
+        deals = table[
+            (table['platinum'].to_numpy() <= constraints.max_price_to_start_search)
+            & (table['quantity'].to_numpy() >= constraints.min_stock)
+            & (table['ratio'].to_numpy() >= constraints.min_ratio_per_item)
+        ]
+        deals = deals.sort_values(['ratio', 'platinum'], ascending=[False, True], kind='stable')
+        deals.insert(1, 'item', deals['item_id'].map(item_data.get))
+        return deals.reset_index(drop=True)
+
     def get_ducat_data_by_id(self, item_id: str) -> int:
-        self.logger.debug(f'Getting ducat price for item with id {item_id}')
-        return self.ducat_data_df[self.ducat_data_df.id == item_id]['ducats'].values[0]
+        self.logger.debug('Getting ducat price for item with id %s', item_id)
+        reference = self._ducat_reference()
+        return reference.ducats[reference.ducat_positions[item_id]]
+
+    def get_ducat_data_by_ids(self, item_ids) -> tuple:
+        """Return the (ducats, dpp) float arrays aligned with item_ids, NaN where an id has no ducat data."""
+        import numpy as np
 
+        reference = self._ducat_reference()
+        positions = reference.ducat_index.get_indexer(item_ids)
+        missing = positions < 0
+        positions[missing] = 0
+        if not len(reference.ducats):
+            return np.full(len(positions), np.nan), np.full(len(positions), np.nan)
+        ducats = reference.ducats.take(positions).astype(float)
+        dpp = reference.dpp.take(positions).astype(float)
+        ducats[missing] = np.nan
+        dpp[missing] = np.nan
+        return ducats, dpp
@@ -1,12 +1,17 @@
+import logging
+
 from models import WarframeMarketCore, logger
 
 
 class Order(WarframeMarketCore):
     def __init__(self, user, order_id: str = ''):
-        super(Order, self).__init__()
+        super(Order, self).__init__(session=user.session, platform=user.platform, language=user.language)
         self.user = user
         self.order_id = order_id
-        self.order_json = self.user.get_order_by_id(self.order_id) if self.order_id != '' else {}
+        self._set_fields(self.user.get_order_by_id(self.order_id) if self.order_id != '' else {})
+
+    def _set_fields(self, order_json: dict) -> None:
+        self.order_json = order_json
         if self.order_json:
             self.item_id = self.order_json['item']['id']
             self.order_type = self.order_json['order_type']
@@ -30,7 +35,7 @@ class Order(WarframeMarketCore):
             logger.warning('Tried to create a new order when it already exists')
             return self
 
-        logger.info(f'Placing a new {order_type} order of {item_id} x{quantity} for {platinum}p each and visible {visible}')
+        logger.info('Placing a new %s order of %s x%s for %sp each and visible %s', order_type, item_id, quantity, platinum, visible)
         self.item_id = item_id
         self.order_type = order_type
         self.platinum = platinum
@@ -46,7 +51,11 @@ class Order(WarframeMarketCore):
             'quantity': self.quantity,
             'visible': self.visible
         }
-        self._json(self._post(url, payload), 200)
+        result = self._json(self._post(url, payload), 200, strict=self.raise_errors)
+        if result:
+            self.order_id = result['order']['id']
+            self._set_fields(result['order'])
+            self.user._store_order(result['order'])
         return self
 
     def change(self, item_id: str = None, platinum: int = None, quantity: int = None, visible: bool = None):
@@ -59,7 +68,8 @@ class Order(WarframeMarketCore):
         if visible is None:
             visible = self.order_json['visible']
 
-        logger.info(f'Changing {self.order_type} order {self.order_id} to {self.item_name} x{quantity} for {platinum}p each and visible {visible} for a total of {quantity * platinum}p')
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Changing %s order %s to %s x%s for %sp each and visible %s for a total of %sp', self.order_type, self.order_id, self.item_name, quantity, platinum, visible, quantity * platinum)
         url = self._build_url('profile', 'orders', self.order_id)
         payload = {
             'item_id': item_id,
@@ -67,10 +77,16 @@ class Order(WarframeMarketCore):
             'quantity': quantity,
             'visible': visible
         }
-        self._json(self._put(url, payload), 200)
+        result = self._json(self._put(url, payload), 200, strict=self.raise_errors)
+        if result:
+            self._set_fields(result['order'])
+            self.user._store_order(result['order'])
         return self
 
     def delete(self) -> dict:
-        logger.info(f'Deleting {self.order_type} order {self.order_id}: {self.item_name} x{self.quantity} for {self.platinum}p each and visible {self.visible}')
+        logger.info('Deleting %s order %s: %s x%s for %sp each and visible %s', self.order_type, self.order_id, self.item_name, self.quantity, self.platinum, self.visible)
         url = self._build_url('profile', 'orders', self.order_id)
-        return self._json(self._delete(url), 200)
+        result = self._json(self._delete(url), 200, strict=self.raise_errors)
+        if result is not None:
+            self.user._forget_order(self.order_id)
+        return result
@@ -1,45 +1,109 @@
+import threading
+import time
+
 from models import WarframeMarketCore, logger
 
 
 class User(WarframeMarketCore):
-    def __init__(self, username: str, platform: str = 'pc', region: str = 'en'):
-        super(User, self).__init__()
+    def __init__(self, username: str, platform: str = 'pc', region: str = 'en', orders_ttl: float = None):
+        super(User, self).__init__(platform=platform, language=region)
         self.username = username
-        self.platform = platform
         self.region = region
-        self.orders_json = {}
+        self.orders_ttl = orders_ttl
+        self._orders_lock = threading.RLock()
+        self._orders_synced_at = None
+        self._orders_by_id = {}
+        self._orders_by_item = {}
+        self._orders_by_type = {}
+        self._orders_json = None
+
+    @property
+    def orders_json(self) -> dict:
+        """The user's orders in the profile orders payload layout, rebuilt from the index after local changes."""
+        if self._orders_synced_at is None:
+            return {}
+        with self._orders_lock:
+            if self._orders_json is None:
+                self._orders_json = {
+                    f'{order_type}_orders': list(orders.values()) for order_type, orders in self._orders_by_type.items()
+                }
+            return self._orders_json
+
+    def _orders_expired(self) -> bool:
+        if self._orders_synced_at is None:
+            return True
+        return self.orders_ttl is not None and time.monotonic() - self._orders_synced_at > self.orders_ttl
+
+    def _index_orders(self, orders_json: dict) -> None:
+        with self._orders_lock:
+            self._orders_by_id = {}
+            self._orders_by_item = {}
+            self._orders_by_type = {'sell': {}, 'buy': {}}
+            for orders in orders_json.values():
+                for order in orders:
+                    self._store_order(order)
+            self._orders_synced_at = time.monotonic()
+
+    def _store_order(self, order: dict) -> None:
+        """Add or replace an order in the indexes, used write-through by Order mutations."""
+        with self._orders_lock:
+            self._forget_order(order['id'])
+            self._orders_by_id[order['id']] = order
+            self._orders_by_item.setdefault(order['item']['id'], {})[order['id']] = order
+            self._orders_by_type.setdefault(order['order_type'], {})[order['id']] = order
+            self._orders_json = None
+
+    def _forget_order(self, order_id: str) -> None:
+        with self._orders_lock:
+            order = self._orders_by_id.pop(order_id, None)
+            if order is None:
+                return
+            self._orders_by_item.get(order['item']['id'], {}).pop(order_id, None)
+            self._orders_by_type.get(order['order_type'], {}).pop(order_id, None)
+            self._orders_json = None
 
     def get_profile(self) -> dict:
-        logger.info(f'Getting info for profile: {self.username}')
+        logger.info('Getting info for profile: %s', self.username)
         url = self._build_url('profile', self.username)
         return self._json(self._get(url), 200)
 
     def get_orders(self, force=False):
-        if self.orders_json and not force:
+        if not force and not self._orders_expired():
             return self.orders_json
-        logger.info(f'Getting orders for profile: {self.username}')
+        logger.info('Getting orders for profile: %s', self.username)
         url = self._build_url('profile', self.username, 'orders')
-        self.orders_json = self._json(self._get(url), 200)
+        orders_json = self._json(self._get(url), 200)
+        if orders_json is None:
+            return self.orders_json
+        self._index_orders(orders_json)
         return self.orders_json
 
+    def get_orders_by_item(self, item_id: str) -> list:
+        self.get_orders()
+        return list(self._orders_by_item.get(item_id, {}).values())
+
+    def get_orders_by_type(self, order_type: str) -> list:
+        self.get_orders()
+        return list(self._orders_by_type.get(order_type, {}).values())
+
     def get_statistics(self) -> dict:
-        logger.info(f'Getting statistics for profile: {self.username}')
+        logger.info('Getting statistics for profile: %s', self.username)
         url = self._build_url('profile', self.username, 'statistics')
         return self._json(self._get(url), 200)
 
     def get_achievements(self) -> dict:
-        logger.info(f'Getting achievements for profile: {self.username}')
+        logger.info('Getting achievements for profile: %s', self.username)
         url = self._build_url('profile', self.username, 'achievements')
         return self._json(self._get(url), 200)
 
     def get_reviews(self) -> dict:
-        logger.info(f'Getting reviews for profile: {self.username}')
+        logger.info('Getting reviews for profile: %s', self.username)
         url = self._build_url('profile', self.username, 'reviews')
         return self._json(self._get(url), 200)
 
     def change_bio(self, message: str) -> dict:
         """Change the current user's profile bio and return JSON of the new bio: "{'about': '<p>Hello World</p>', 'about_raw': 'Hello World'}"."""
-        logger.info(f'Changing profile bio for user {self.username}')
+        logger.info('Changing profile bio for user %s', self.username)
         url = self._build_url('profile', 'customization', 'about')
         payload = {
             'about': message
@@ -51,12 +115,12 @@ class User(WarframeMarketCore):
         Get the user's settings.
         Returns error for now.
         """
-        logger.info(f'Getting settings for user {self.username}')
+        logger.info('Getting settings for user %s', self.username)
         url = self._build_url('settings')
         return self._json(self._get(url), 200)
 
     def change_settings(self, platform: str, region: str) -> dict:
-        logger.info(f'Changing settings for user {self.username} ({self.platform} -> {platform}, {self.region} -> {region})')
+        logger.info('Changing settings for user %s (%s -> %s, %s -> %s)', self.username, self.platform, platform, self.region, region)
         url = self._build_url('settings', 'verification')
         payload = {
             'platform': platform,
@@ -69,11 +133,10 @@ class User(WarframeMarketCore):
         return self._json(self._delete(url), 200)
 
     def _set_status(self, status: str) -> None:
-        logger.info(f'Setting status of user {self.username} to {status}')
-        websocket = self._open_ws(platform=self.platform)
-        websocket.send(f'{{"type":"@WS/USER/SET_STATUS","payload":"{status}"}}')
-        websocket.close()
-        logger.info(f'Status of user {self.username} successfully changed to {status}')
+        from websocket_manager import SET_STATUS
+
+        logger.info('Setting status of user %s to %s', self.username, status)
+        self._websocket().send(SET_STATUS, status)
 
     def set_ingame(self) -> None:
         self._set_status('ingame')
@@ -85,7 +148,7 @@ class User(WarframeMarketCore):
         self._set_status('offline')
 
     def change_review_visibility(self, review_id: str, visible: bool) -> dict:
-        logger.info(f'Changing review {review_id} to {"visible" if visible else "invisible"}')
+        logger.info('Changing review %s to %s', review_id, 'visible' if visible else 'invisible')
         url = self._build_url('profile', self.username, 'review', review_id)
         payload = {
             'hidden': not visible
@@ -97,7 +160,7 @@ class User(WarframeMarketCore):
         Change the text of a review that you wrote for a user.
         There's no endpoint to find the ids of reviews that you wrote, so it's UNTESTED and I'm not sure the endpoint works
         """
-        logger.info(f'Changing review {review_id} of user {username} to "{text}"')
+        logger.info('Changing review %s of user %s to "%s"', review_id, username, text)
         url = self._build_url('profile', username, 'review', review_id)
         payload = {
             'text': text
@@ -109,13 +172,10 @@ class User(WarframeMarketCore):
         Delete the review with the given id that you wrote for a user.
         There's no endpoint to find the ids of reviews that you wrote.
         """
-        logger.info(f'Deleting review {review_id} of user {username}')
+        logger.info('Deleting review %s of user %s', review_id, username)
         url = self._build_url('profile', username, 'review', review_id)
         return self._json(self._delete(url), 200)
 
     def get_order_by_id(self, order_id: str) -> dict:
         self.get_orders()
-        for order_type, orders in self.orders_json.items():
-            for order in orders:
-                if order['id'] == order_id:
-                    return order
+        return self._orders_by_id.get(order_id)
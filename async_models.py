@@ -0,0 +1,163 @@
+import asyncio
+import json
+import logging
+import time
+import weakref
+
+import aiohttp
+import requests
+
+import cache
+import ratelimit
+import singleflight
+from models import WarframeMarketCore, logger
+
+_async_transport_config = {
+    'limit': 100,
+    'limit_per_host': 32,
+    'keepalive_timeout': 30,
+}
+_client_sessions = weakref.WeakKeyDictionary()
+
+
+def configure_async_transport(**config) -> None:
+    """Configure the connection pool (limit, limit_per_host, keepalive_timeout) used by new async sessions."""
+    unknown = set(config) - set(_async_transport_config)
+    if unknown:
+        raise ValueError(f'Unknown transport options: {", ".join(sorted(unknown))}')
+    _async_transport_config.update(config)
+
+
+def get_shared_client_session() -> aiohttp.ClientSession:
+    """Return the pooled aiohttp session of the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    session = _client_sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(**_async_transport_config)
+        session = aiohttp.ClientSession(connector=connector, headers={'Content-Type': 'application/json'})
+        _client_sessions[loop] = session
+    return session
+
+
+async def close_shared_client_session() -> None:
+    session = _client_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+class BufferedResponse:
+    """A fully read aiohttp response exposing the parts of requests.Response that _json relies on."""
+
+    def __init__(self, url: str, status_code: int, headers, content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncWarframeMarketCore(WarframeMarketCore):
+    single_flight = singleflight.AsyncSingleFlight()
+
+    @staticmethod
+    def _default_session():
+        # aiohttp sessions are bound to an event loop, so the shared one is resolved per request
+        return None
+
+    async def _request(self, method: str, url: str, data=None, **kwargs) -> BufferedResponse:
+        headers = self._headers()
+        headers.update(kwargs.pop('headers', None) or {})
+        session = self.session if self.session is not None else get_shared_client_session()
+        limiter = self.rate_limiter
+        bucket = limiter.bucket(ratelimit.endpoint_family(url, self._market_url)) if limiter is not None else None
+        attempt = 0
+        while True:
+            wait = 0.0
+            if bucket is not None:
+                wait = bucket.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+            started = time.perf_counter()
+            try:
+                async with session.request(method.upper(), url, data=data, headers=headers, **kwargs) as raw_response:
+                    content = await raw_response.read()
+                    response = BufferedResponse(str(raw_response.url), raw_response.status, raw_response.headers, content)
+            except asyncio.TimeoutError as exc:
+                self._observe_attempt(method, url, attempt, started, wait, (data,), error=exc)
+                raise requests.exceptions.Timeout(exc)
+            except aiohttp.ClientError as exc:
+                self._observe_attempt(method, url, attempt, started, wait, (data,), error=exc)
+                raise requests.exceptions.ConnectionError(exc)
+            self._observe_attempt(method, url, attempt, started, wait, (data,), response=response)
+
+            if bucket is None or not limiter.should_retry(method, response.status_code, attempt):
+                if bucket is not None:
+                    if response.status_code < 400:
+                        bucket.reward()
+                    else:
+                        limiter.throttled(bucket, response)
+                return response
+
+            delay = limiter.backoff(bucket, attempt, response)
+            logger.warning("%s %s returned %s, retrying in %.2fs", method.upper(), url, response.status_code, delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _delete(self, url: str, **kwargs) -> BufferedResponse:
+        logger.debug("DELETE %s with %s", url, kwargs)
+        return await self._request("delete", url, **kwargs)
+
+    async def _get(self, url: str, **kwargs) -> BufferedResponse:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("GET %s with %s", url, kwargs)
+        if self.single_flight is None:
+            return await self._cached_get(url, **kwargs)
+        key = self._flight_key(url, kwargs)
+
+        async def fetch():
+            return singleflight.SharedResponse(await self._cached_get(url, **kwargs))
+
+        response, shared = await self.single_flight.do(key, fetch)
+        if shared:
+            self._observe_cache(url, 'coalesced')
+        return response
+
+    async def _cached_get(self, url: str, **kwargs) -> BufferedResponse:
+        slot = self._cache_slot(url)
+        if slot is None:
+            return await self._request("get", url, **kwargs)
+
+        entry = slot[0].get(slot[1])
+        if entry is not None and entry.is_fresh():
+            self._observe_cache(url, 'hit')
+            return cache.CachedResponse(entry)
+        if entry is not None:
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **entry.conditional_headers())
+        response = await self._request("get", url, **kwargs)
+        self._observe_cache(url, 'revalidated' if entry is not None and response.status_code == 304 else 'miss')
+        return self._cache_response(slot, entry, response)
+
+    async def _patch(self, url: str, data=None, json_: bool = True, **kwargs) -> BufferedResponse:
+        if json_:
+            data = json.dumps(data) if data is not None else data
+        logger.debug("PATCH %s with %s", url, kwargs)
+        return await self._request("patch", url, data, **kwargs)
+
+    async def _post(self, url: str, data=None, json_: bool = True, **kwargs) -> BufferedResponse:
+        if json_:
+            data = json.dumps(data) if data is not None else data
+        logger.debug("POST %s with %s, %s", url, data, kwargs)
+        return await self._request("post", url, data, **kwargs)
+
+    async def _put(self, url: str, data=None, json_: bool = True, **kwargs) -> BufferedResponse:
+        if json_:
+            data = json.dumps(data) if data is not None else data
+        logger.debug("PUT %s with %s", url, kwargs)
+        return await self._request("put", url, data, **kwargs)
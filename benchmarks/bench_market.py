@@ -0,0 +1,219 @@
+"""
+Benchmarks of the wrapper against the offline mock server (benchmarks/mock_server.py).
+
+    python benchmarks/bench_market.py [--latency 0.02] [--throttle-rate 0.02] [--only fanout reprice] [--json]
+
+Every benchmark reports operations, throughput and p50/p99 latency of one operation; memory reports bytes per cached order.
+Runs in a temporary directory, so the reference data files it downloads don't touch the working tree.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path[:0] = [ROOT, BENCHMARKS]
+
+import utility
+from Market import Market, SearchConstraints
+from User import User
+from bench_startup import measure_startup
+from mock_server import Fixtures, MockMarketServer
+from models import WarframeMarketCore
+
+
+def percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else float('nan')
+
+
+def summarize(name: str, latencies: list, elapsed: float, operations: int = None, **extra) -> dict:
+    """Throughput counts operations (one per latency sample unless given) per second of elapsed time."""
+    operations = len(latencies) if operations is None else operations
+    return dict({
+        'benchmark': name,
+        'operations': operations,
+        'throughput': operations / elapsed if elapsed else float('nan'),
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }, **extra)
+
+
+def timed(function, latencies: list):
+    def call(argument):
+        started = time.perf_counter()
+        try:
+            return function(argument)
+        finally:
+            latencies.append(time.perf_counter() - started)
+    return call
+
+
+def bench_fanout(market: Market, items: list, concurrency: int, rounds: int) -> dict:
+    """Uncached item order fetches of every item through a thread pool."""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        WarframeMarketCore.response_cache.clear()
+        for _ in utility.map_concurrently(timed(market.get_item_orders, latencies), items, concurrency):
+            pass
+    return summarize('fanout', latencies, time.perf_counter() - started)
+
+
+def bench_fanout_async(user: User, items: list, concurrency: int, rounds: int) -> dict:
+    """Same fan-out through AsyncMarket.gather_item_orders; latency is per HTTP attempt, taken from the request tracer."""
+    from AsyncMarket import AsyncMarket
+    from AsyncUser import AsyncUser
+    from async_models import close_shared_client_session
+
+    latencies = []
+
+    def trace(request_trace) -> None:
+        latencies.append(request_trace.elapsed)
+
+    async def run() -> float:
+        market = AsyncMarket(AsyncUser(user.username, user.platform, user.region))
+        started = time.perf_counter()
+        for _ in range(rounds):
+            WarframeMarketCore.response_cache.clear()
+            async for _ in market.gather_item_orders(items, concurrency, return_exceptions=True):
+                pass
+        elapsed = time.perf_counter() - started
+        await close_shared_client_session()
+        return elapsed
+
+    WarframeMarketCore.metrics.add_tracer(trace)
+    try:
+        elapsed = asyncio.run(run())
+    finally:
+        WarframeMarketCore.metrics.remove_tracer(trace)
+    return summarize('fanout-async', latencies, elapsed, operations=len(items) * rounds)
+
+
+def bench_reprice(market: Market, fixtures: Fixtures, items: list, concurrency: int, rounds: int) -> dict:
+    """Place one order per item, reprice all of them `rounds` times, then delete them. Latency is per repricing batch."""
+    placed = market.place_orders([
+        {'item_id': fixtures.items_by_name[item]['id'], 'order_type': 'sell', 'platinum': 100, 'quantity': 1} for item in items
+    ], concurrency)
+    order_ids = [result.result['id'] for result in placed if result.ok]
+
+    latencies = []
+    for round_index in range(rounds):
+        prices = {order_id: 99 - round_index for order_id in order_ids}
+        started = time.perf_counter()
+        market.reprice_orders(prices, concurrency)
+        latencies.append(time.perf_counter() - started)
+    market.delete_orders(order_ids, concurrency)
+    return summarize('reprice', latencies, sum(latencies), operations=len(order_ids) * rounds)
+
+
+def bench_ducat_search(market: Market, concurrency: int, rounds: int) -> dict:
+    """find_ducat_deals over the whole generated catalogue, uncached."""
+    constraints = SearchConstraints(0.0, 1000, 0.0, 1, 0, 1000)
+    latencies = []
+    deals = 0
+    for _ in range(rounds):
+        WarframeMarketCore.response_cache.clear()
+        started = time.perf_counter()
+        deals = len(market.find_ducat_deals(constraints, concurrency))
+        latencies.append(time.perf_counter() - started)
+    return summarize('ducat-search', latencies, sum(latencies), deals=deals)
+
+
+def bench_memory(market: Market, items: list) -> dict:
+    """Bytes per order held by the response cache (body plus memoized payload) and by an OrderTable of the same orders."""
+    from records import OrderTable
+
+    WarframeMarketCore.response_cache.clear()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    payloads = [market.get_item_orders(item) for item in items]
+    cached = tracemalloc.get_traced_memory()[0] - before
+    orders = sum(len(payload['orders']) for payload in payloads)
+
+    before = tracemalloc.get_traced_memory()[0]
+    tables = [OrderTable.from_orders(payload['orders'], item) for item, payload in zip(items, payloads)]
+    columnar = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del tables
+    return {
+        'benchmark': 'memory',
+        'orders': orders,
+        'cached_bytes_per_order': cached / orders if orders else float('nan'),
+        'table_bytes_per_order': columnar / orders if orders else float('nan'),
+    }
+
+
+def bench_startup() -> dict:
+    elapsed, heavy = measure_startup()
+    return {'benchmark': 'startup', 'startup_ms': elapsed * 1000, 'eager_imports': heavy}
+
+
+def format_result(result: dict) -> str:
+    fields = []
+    for name, value in result.items():
+        if name == 'benchmark':
+            continue
+        fields.append(f'{name}={value:.2f}' if isinstance(value, float) else f'{name}={value}')
+    return f'{result["benchmark"]:<14} ' + ' '.join(fields)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=200, help='catalogue size of the mock server')
+    parser.add_argument('--orders-per-item', type=int, default=60)
+    parser.add_argument('--fanout-items', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.005, help='server latency per request in seconds')
+    parser.add_argument('--jitter', type=float, default=0.005)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--fixtures', help='directory of recorded response bodies')
+    parser.add_argument('--only', nargs='+', choices=('fanout', 'fanout-async', 'reprice', 'ducat-search', 'memory', 'startup'))
+    parser.add_argument('--json', action='store_true', help='print results as JSON lines')
+    args = parser.parse_args()
+
+    selected = set(args.only or ('fanout', 'fanout-async', 'reprice', 'ducat-search', 'memory', 'startup'))
+    fixtures = Fixtures(args.items, args.orders_per_item, directory=args.fixtures)
+    items = [item['url_name'] for item in fixtures.items[:args.fanout_items]]
+    results = []
+    workdir = os.getcwd()
+    with tempfile.TemporaryDirectory() as tempdir, MockMarketServer(
+            fixtures, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, throttle_rate=args.throttle_rate
+    ) as server:
+        os.chdir(tempdir)
+        try:
+            server.install()
+            user = User('benchmark')
+            market = Market(user)
+            market.update_item_data()
+            if 'fanout' in selected:
+                results.append(bench_fanout(market, items, args.concurrency, args.rounds))
+            if 'fanout-async' in selected:
+                results.append(bench_fanout_async(user, items, args.concurrency, args.rounds))
+            if 'reprice' in selected:
+                results.append(bench_reprice(market, fixtures, items, args.concurrency, args.rounds))
+            if 'ducat-search' in selected:
+                results.append(bench_ducat_search(market, args.concurrency, args.rounds))
+            if 'memory' in selected:
+                results.append(bench_memory(market, items))
+        finally:
+            os.chdir(workdir)
+    if 'startup' in selected:
+        results.append(bench_startup())
+
+    for result in results:
+        print(json.dumps(result) if args.json else format_result(result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
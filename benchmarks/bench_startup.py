@@ -0,0 +1,58 @@
+"""
+Startup regression check: importing the library and constructing a Market must not load pandas/websocket or touch the network.
+Run from the repository root: python benchmarks/bench_startup.py [--max-ms 300]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_SCRIPT = '''
+import sys, time
+start = time.perf_counter()
+from Market import Market
+from User import User
+market = Market(User('benchmark'))
+elapsed = time.perf_counter() - start
+heavy = [name for name in ('pandas', 'numpy', 'websocket') if name in sys.modules]
+print(elapsed, ','.join(heavy))
+'''
+
+
+def measure_startup(runs: int = 5) -> tuple:
+    """Return the best cold-start time in seconds over `runs` fresh interpreters and the heavy modules that got imported."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    timings = []
+    heavy = ''
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, '-c', STARTUP_SCRIPT], cwd=workdir, env=env, check=True, capture_output=True, text=True
+            ).stdout.split()
+            timings.append(float(output[0]))
+            heavy = output[1] if len(output) > 1 else ''
+    return min(timings), heavy
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=300.0)
+    args = parser.parse_args()
+
+    elapsed, heavy = measure_startup(args.runs)
+    print(f'startup: {elapsed * 1000:.1f} ms (limit {args.max_ms:.0f} ms)')
+    if heavy:
+        print(f'FAIL: eagerly imported {heavy}')
+        return 1
+    if elapsed * 1000 > args.max_ms:
+        print('FAIL: startup slower than the limit')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
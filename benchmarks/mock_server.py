@@ -0,0 +1,542 @@
+"""
+Offline stand-in for the warframe.market API and websocket, serving recorded fixtures or generated data.
+
+    python benchmarks/mock_server.py --port 8765 --latency 0.02 --throttle-rate 0.05
+    python benchmarks/mock_server.py --record fixtures items tools/ducats items/ash_prime_set/orders
+
+Recorded fixtures are response bodies saved as <fixtures>/<path>.json (e.g. fixtures/items/ash_prime_set/orders.json),
+any other path falls back to deterministic generated data. In-process use:
+
+    with MockMarketServer(latency=0.01) as server:
+        server.install()
+        Market(User('benchmark')).get_item_orders('item_0001')
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+API_PREFIX = '/v1'
+WS_PATH = '/socket'
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+STATUSES = ('ingame', 'online', 'offline')
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.000+00:00')
+
+
+class Fixtures:
+    """Deterministic catalogue, order books and statistics; recorded bodies in `directory` take precedence."""
+
+    def __init__(self, items: int = 200, orders_per_item: int = 60, seed: int = 0, directory: str = None):
+        self.directory = directory
+        self.orders_per_item = orders_per_item
+        self.seed = seed
+        self.now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.items = [{
+            'id': f'{index:024x}',
+            'url_name': f'item_{index:04d}',
+            'item_name': f'Item {index:04d}',
+            'thumb': f'items/images/en/thumbs/item_{index:04d}.png',
+        } for index in range(items)]
+        self.items_by_name = {item['url_name']: item for item in self.items}
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def recorded(self, path: str) -> bytes:
+        if self.directory is None:
+            return None
+        file_path = os.path.join(self.directory, *path.strip('/').split('/')) + '.json'
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, 'rb') as file:
+            return file.read()
+
+    def item_block(self, item: dict) -> dict:
+        return {'id': item['id'], 'url_name': item['url_name'], 'en': {'item_name': item['item_name']}}
+
+    def items_payload(self) -> dict:
+        return {'items': {'en': self.items}}
+
+    def ducats_payload(self) -> dict:
+        rng = random.Random(self.seed)
+        rows = []
+        for item in self.items:
+            ducats = rng.choice((15, 25, 45, 65, 100))
+            rows.append({'item': item['id'], 'ducats': ducats, 'ducats_per_platinum_wa': round(ducats / rng.uniform(2, 40), 3),
+                         'datetime': _timestamp(self.now), 'position_change_month': 0, 'position_change_week': 0, 'position_change_day': 0})
+        return {'previous_day': rows, 'previous_hour': rows}
+
+    def item_orders(self, url_name: str) -> list:
+        with self._lock:
+            orders = self._orders.get(url_name)
+            if orders is None:
+                rng = random.Random(f'{self.seed}:{url_name}')
+                base_price = rng.randint(5, 300)
+                orders = self._orders[url_name] = [{
+                    'id': f'{rng.getrandbits(96):024x}',
+                    'order_type': 'sell' if index % 3 else 'buy',
+                    'platinum': max(1, base_price + rng.randint(-base_price // 2, base_price // 2)),
+                    'quantity': rng.randint(1, 20),
+                    'visible': True,
+                    'platform': 'pc',
+                    'region': 'en',
+                    'creation_date': _timestamp(self.now - timedelta(days=rng.randint(1, 90))),
+                    'last_update': _timestamp(self.now - timedelta(minutes=rng.randint(1, 10000))),
+                    'user': {'id': f'{rng.getrandbits(96):024x}', 'ingame_name': f'seller_{rng.randint(0, 5000)}',
+                             'status': rng.choice(STATUSES), 'region': 'en', 'reputation': rng.randint(0, 500)},
+                } for index in range(self.orders_per_item)]
+            return orders
+
+    def statistics_payload(self, url_name: str) -> dict:
+        rng = random.Random(f'{self.seed}:statistics:{url_name}')
+        price = rng.randint(5, 300)
+
+        def series(count: int, step: timedelta, order_types: tuple = (None,)) -> list:
+            # Live statistics have a buy and a sell row for every timestamp
+            rows = []
+            for index in range(count):
+                for order_type in order_types:
+                    low, high = price * rng.uniform(0.6, 1.0), price * rng.uniform(1.0, 1.5)
+                    row = {'datetime': _timestamp(self.now - step * (count - index)), 'volume': rng.randint(0, 100),
+                           'min_price': round(low), 'max_price': round(high), 'avg_price': round((low + high) / 2, 1),
+                           'wa_price': round((low + high) / 2, 1), 'median': round((low + high) / 2, 1), 'id': f'{rng.getrandbits(96):024x}'}
+                    if order_type is not None:
+                        row['order_type'] = order_type
+                    rows.append(row)
+            return rows
+
+        live = ('buy', 'sell')
+        return {
+            'statistics_closed': {'48hours': series(48, timedelta(hours=1)), '90days': series(90, timedelta(days=1))},
+            'statistics_live': {'48hours': series(48, timedelta(hours=1), live), '90days': series(90, timedelta(days=1), live)},
+        }
+
+    def most_recent_payload(self) -> dict:
+        orders = []
+        for item in self.items[:100]:
+            order = dict(self.item_orders(item['url_name'])[0], item=self.item_block(item))
+            orders.append(order)
+        return {'orders': orders[:500]}
+
+
+class ProfileOrders:
+    """Orders of the signed-in user, mutated by the profile orders endpoints."""
+
+    def __init__(self, fixtures: Fixtures):
+        self.fixtures = fixtures
+        self.orders = {}
+        self._lock = threading.Lock()
+        self._ids = 0
+
+    def payload(self) -> dict:
+        with self._lock:
+            orders = list(self.orders.values())
+        return {
+            'sell_orders': [order for order in orders if order['order_type'] == 'sell'],
+            'buy_orders': [order for order in orders if order['order_type'] == 'buy'],
+        }
+
+    def create(self, body: dict) -> dict:
+        item = next((item for item in self.fixtures.items if item['id'] == body.get('item_id')), None)
+        if item is None:
+            return None
+        with self._lock:
+            self._ids += 1
+            order = {
+                'id': f'{0xffff00000000 + self._ids:024x}', 'order_type': body['order_type'], 'platinum': body['platinum'],
+                'quantity': body['quantity'], 'visible': body.get('visible', True), 'platform': 'pc', 'region': 'en',
+                'creation_date': _timestamp(datetime.now(timezone.utc)), 'last_update': _timestamp(datetime.now(timezone.utc)),
+                'item': self.fixtures.item_block(item),
+            }
+            self.orders[order['id']] = order
+        return order
+
+    def update(self, order_id: str, body: dict) -> dict:
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None:
+                return None
+            order = dict(order, last_update=_timestamp(datetime.now(timezone.utc)))
+            for field in ('platinum', 'quantity', 'visible'):
+                if field in body:
+                    order[field] = body[field]
+            self.orders[order_id] = order
+        return order
+
+    def delete(self, order_id: str) -> dict:
+        with self._lock:
+            order = self.orders.pop(order_id, None)
+        return None if order is None else {'order_id': order_id}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockWarframeMarket/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def mock(self) -> 'MockMarketServer':
+        return self.server.mock
+
+    def do_GET(self):
+        if urlsplit(self.path).path == WS_PATH and self.headers.get('Upgrade', '').lower() == 'websocket':
+            self.mock.serve_websocket(self)
+        else:
+            self._handle('get')
+
+    def do_POST(self):
+        self._handle('post')
+
+    def do_PUT(self):
+        self._handle('put')
+
+    def do_PATCH(self):
+        self._handle('patch')
+
+    def do_DELETE(self):
+        self._handle('delete')
+
+    def _handle(self, method: str) -> None:
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        status, headers, content = self.mock.respond(method, urlsplit(self.path).path, body, self.headers)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+class MockMarketServer:
+    """
+    Threaded HTTP + websocket server imitating the parts of warframe.market the library uses.
+
+    latency (+ uniform jitter) delays every response, error_rate answers that share of requests with a 500,
+    throttle_rate with a 429, and rate_limit (requests per second) throttles anything above it like the real API.
+    The websocket announces ONLINE_COUNT on connect and, once subscribed, a NEW_ORDER every ws_interval seconds.
+    """
+
+    def __init__(self, fixtures: Fixtures = None, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 throttle_rate: float = 0.0, rate_limit: float = None, retry_after: float = 0.1, ws_interval: float = 0.05,
+                 seed: int = 0, host: str = '127.0.0.1', port: int = 0):
+        self.fixtures = fixtures if fixtures is not None else Fixtures(seed=seed)
+        self.profile_orders = ProfileOrders(self.fixtures)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.ws_interval = ws_interval
+        self.requests = Counter()
+        self.responses = Counter()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._recent = deque()
+        self._recent_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = None
+        self._stopped = threading.Event()
+        self._installed = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}{API_PREFIX}'
+
+    @property
+    def ws_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f'ws://{host}:{port}{WS_PATH}'
+
+    def start(self) -> 'MockMarketServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-market', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.uninstall()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'MockMarketServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def install(self, secret: str = 'mock', client_rate: float = 1000.0) -> None:
+        """
+        Point WarframeMarketCore (and every client class) at this server, with an empty response cache and a fixed secret.
+        The client rate limiter is replaced by one allowing client_rate requests per second per endpoint family (None keeps it).
+        """
+        if ROOT not in sys.path:
+            sys.path.insert(0, ROOT)
+        import ratelimit
+        from models import WarframeMarketCore
+
+        if self._installed is None:
+            self._installed = (WarframeMarketCore.market_url, WarframeMarketCore.ws_url, WarframeMarketCore.secret, WarframeMarketCore.rate_limiter)
+        WarframeMarketCore.market_url = self.url
+        WarframeMarketCore.ws_url = self.ws_url
+        WarframeMarketCore.secret = secret
+        if client_rate is not None:
+            rates = {family: client_rate for family in ratelimit.RateLimiter.default_rates}
+            WarframeMarketCore.rate_limiter = ratelimit.RateLimiter(rates, default_rate=client_rate, backoff_base=0.01)
+        if WarframeMarketCore.response_cache is not None:
+            WarframeMarketCore.response_cache.clear()
+
+    def uninstall(self) -> None:
+        if self._installed is None:
+            return
+        from models import WarframeMarketCore
+
+        WarframeMarketCore.market_url, WarframeMarketCore.ws_url, WarframeMarketCore.secret, WarframeMarketCore.rate_limiter = self._installed
+        self._installed = None
+
+    def _chance(self, probability: float) -> bool:
+        if probability <= 0:
+            return False
+        with self._random_lock:
+            return self._random.random() < probability
+
+    def _over_rate_limit(self) -> bool:
+        if self.rate_limit is None:
+            return False
+        now = time.monotonic()
+        with self._recent_lock:
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                return True
+            self._recent.append(now)
+            return False
+
+    def respond(self, method: str, path: str, body: bytes, headers) -> tuple:
+        """Return (status, headers, content) for one request."""
+        if self.latency or self.jitter:
+            with self._random_lock:
+                delay = self.latency + self._random.uniform(0, self.jitter)
+            time.sleep(delay)
+
+        path = path[len(API_PREFIX):] if path.startswith(API_PREFIX) else path
+        self.requests[method, path.split('/')[1] if '/' in path else path] += 1
+        if self._over_rate_limit() or self._chance(self.throttle_rate):
+            status, extra_headers, content = 429, {'Retry-After': str(self.retry_after)}, b'{"error": "Too Many Requests"}'
+        elif self._chance(self.error_rate):
+            status, extra_headers, content = 500, {}, b'{"error": "Internal Server Error"}'
+        else:
+            status, payload = self._route(method, path.strip('/'), body)
+            extra_headers = {}
+            content = payload if isinstance(payload, bytes) else json.dumps(
+                {'payload': payload} if status < 400 else {'error': payload}
+            ).encode('utf-8')
+        self.responses[status] += 1
+        return status, extra_headers, content
+
+    def _route(self, method: str, path: str, body: bytes) -> tuple:
+        parts = path.split('/')
+        if method == 'get':
+            recorded = self.fixtures.recorded(path)
+            if recorded is not None:
+                return 200, recorded
+            if parts == ['items']:
+                return 200, self.fixtures.items_payload()
+            if parts == ['tools', 'ducats']:
+                return 200, self.fixtures.ducats_payload()
+            if parts == ['most_recent']:
+                return 200, self.fixtures.most_recent_payload()
+            if parts[0] == 'items' and len(parts) in (2, 3):
+                item = self.fixtures.items_by_name.get(parts[1])
+                if item is None:
+                    return 404, {'request': ['app.item.not_exist']}
+                if len(parts) == 2:
+                    return 200, {'item': {'id': item['id'], 'items_in_set': [dict(item, en={'item_name': item['item_name']})]}}
+                if parts[2] == 'orders':
+                    return 200, {'orders': self.fixtures.item_orders(parts[1])}
+                if parts[2] == 'statistics':
+                    return 200, self.fixtures.statistics_payload(parts[1])
+            if parts[0] == 'profile' and len(parts) == 3 and parts[2] == 'orders':
+                return 200, self.profile_orders.payload()
+            if parts[0] == 'profile' and len(parts) == 2:
+                return 200, {'profile': {'ingame_name': parts[1], 'status': 'ingame', 'region': 'en', 'reputation': 0}}
+            return 404, {'request': ['app.not_found']}
+
+        data = json.loads(body or b'{}')
+        if parts == ['profile', 'orders'] and method == 'post':
+            order = self.profile_orders.create(data)
+            return (200, {'order': order}) if order is not None else (400, {'item_id': ['app.form.invalid']})
+        if parts[:2] == ['profile', 'orders'] and len(parts) == 3:
+            if method == 'put':
+                order = self.profile_orders.update(parts[2], data)
+                return (200, {'order': order}) if order is not None else (404, {'order_id': ['app.order.not_exist']})
+            if method == 'delete':
+                result = self.profile_orders.delete(parts[2])
+                return (200, result) if result is not None else (404, {'order_id': ['app.order.not_exist']})
+        return 404, {'request': ['app.not_found']}
+
+    # Websocket (RFC 6455, text frames only)
+
+    def serve_websocket(self, handler: _Handler) -> None:
+        key = handler.headers.get('Sec-WebSocket-Key', '')
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode('ascii')).digest()).decode('ascii')
+        handler.send_response(101, 'Switching Protocols')
+        handler.send_header('Upgrade', 'websocket')
+        handler.send_header('Connection', 'Upgrade')
+        handler.send_header('Sec-WebSocket-Accept', accept)
+        handler.end_headers()
+        handler.wfile.flush()
+        handler.close_connection = True
+
+        connection = handler.connection
+        send_lock = threading.Lock()
+        subscribed = threading.Event()
+        closed = threading.Event()
+
+        def send(message_type: str, payload) -> None:
+            self._send_frame(connection, send_lock, 0x1, json.dumps({'type': message_type, 'payload': payload}).encode('utf-8'))
+
+        def publish() -> None:
+            items = self.fixtures.items
+            index = 0
+            while not closed.wait(self.ws_interval) and not self._stopped.is_set():
+                if not subscribed.is_set() or not items:
+                    continue
+                item = items[index % len(items)]
+                order = dict(self.fixtures.item_orders(item['url_name'])[index % self.fixtures.orders_per_item], item=self.fixtures.item_block(item))
+                index += 1
+                try:
+                    send('@WS/SUBSCRIPTIONS/MOST_RECENT/NEW_ORDER', {'order': order})
+                except OSError:
+                    return
+
+        send('@WS/MESSAGE/ONLINE_COUNT', {'total_users': 4000, 'registered_users': 3000})
+        threading.Thread(target=publish, name='mock-market-ws', daemon=True).start()
+        try:
+            while not self._stopped.is_set():
+                frame = self._read_frame(handler.rfile)
+                if frame is None:
+                    return
+                opcode, data = frame
+                if opcode == 0x8:
+                    self._send_frame(connection, send_lock, 0x8, data[:2])
+                    return
+                if opcode == 0x9:
+                    self._send_frame(connection, send_lock, 0xA, data)
+                elif opcode == 0x1:
+                    message = json.loads(data)
+                    if message.get('type') == '@WS/SUBSCRIBE/MOST_RECENT':
+                        subscribed.set()
+                    elif message.get('type') == '@WS/UNSUBSCRIBE/MOST_RECENT':
+                        subscribed.clear()
+                    elif message.get('type') == '@WS/USER/SET_STATUS':
+                        send('@WS/USER/SET_STATUS', message.get('payload'))
+        except (OSError, ValueError):
+            return
+        finally:
+            closed.set()
+
+    @staticmethod
+    def _read_frame(stream) -> tuple:
+        header = stream.read(2)
+        if len(header) < 2:
+            return None
+        opcode = header[0] & 0x0F
+        masked = header[1] & 0x80
+        length = header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack('!H', stream.read(2))[0]
+        elif length == 127:
+            length = struct.unpack('!Q', stream.read(8))[0]
+        mask = stream.read(4) if masked else None
+        data = stream.read(length)
+        if mask:
+            data = bytes(byte ^ mask[index % 4] for index, byte in enumerate(data))
+        return opcode, data
+
+    @staticmethod
+    def _send_frame(connection: socket.socket, lock: threading.Lock, opcode: int, data: bytes) -> None:
+        length = len(data)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        with lock:
+            connection.sendall(header + data)
+
+
+def record_fixtures(directory: str, paths: list, market_url: str = 'https://api.warframe.market/v1') -> None:
+    """Save live API response bodies as fixtures, e.g. paths ['items', 'items/ash_prime_set/orders']."""
+    import requests
+
+    for path in paths:
+        response = requests.get(f'{market_url}/{path.strip("/")}', headers={'Platform': 'pc', 'Language': 'en'}, timeout=30)
+        response.raise_for_status()
+        file_path = os.path.join(directory, *path.strip('/').split('/')) + '.json'
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as file:
+            file.write(response.content)
+        print(f'recorded {path} ({len(response.content)} bytes)')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--fixtures', help='directory of recorded response bodies')
+    parser.add_argument('--record', nargs='+', metavar='PATH', help='record these API paths into --fixtures and exit')
+    parser.add_argument('--items', type=int, default=200)
+    parser.add_argument('--orders-per-item', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float)
+    args = parser.parse_args()
+
+    if args.record:
+        if not args.fixtures:
+            parser.error('--record needs --fixtures')
+        record_fixtures(args.fixtures, args.record)
+        return 0
+
+    server = MockMarketServer(
+        Fixtures(args.items, args.orders_per_item, directory=args.fixtures), latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, rate_limit=args.rate_limit, host=args.host, port=args.port
+    )
+    print(f'serving {server.url} and {server.ws_url}')
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import decoding
+
+# (path pattern relative to the API root, seconds to keep the response fresh)
+DEFAULT_TTLS = [
+    (r'items', 24 * 3600),
+    (r'items/[^/]+', 24 * 3600),
+    (r'items/[^/]+/statistics', 3600),
+    (r'tools/ducats', 3600),
+    (r'profile/[^/]+', 60),
+]
+
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified', 'Content-Type')
+
+
+class CacheEntry:
+    def __init__(self, url: str, status_code: int, headers: dict, content: bytes, expires_at: float):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.expires_at = expires_at
+        self.decoded = None
+
+    @classmethod
+    def from_response(cls, response, ttl: float) -> 'CacheEntry':
+        headers = {name: response.headers[name] for name in VALIDATOR_HEADERS if name in response.headers}
+        return cls(str(response.url), response.status_code, headers, response.content, time.time() + ttl)
+
+    @property
+    def size(self) -> int:
+        return len(self.content) + len(self.url)
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def conditional_headers(self) -> dict:
+        headers = {}
+        if 'ETag' in self.headers:
+            headers['If-None-Match'] = self.headers['ETag']
+        if 'Last-Modified' in self.headers:
+            headers['If-Modified-Since'] = self.headers['Last-Modified']
+        return headers
+
+
+class CachedResponse:
+    """
+    Response served from a cache entry. The extracted payload is memoized on the entry,
+    so every hit (and every 304 revalidation) shares one decoded object which callers must not mutate.
+    """
+
+    from_cache = True
+
+    def __init__(self, entry: CacheEntry):
+        self.entry = entry
+        self.url = entry.url
+        self.status_code = entry.status_code
+        self.headers = entry.headers
+        self.content = entry.content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return decoding.loads(self.content)
+
+    def extract(self) -> tuple:
+        if self.entry.decoded is None:
+            self.entry.decoded = decoding.extract(self.content)
+        return self.entry.decoded
+
+
+class ResponseCache:
+    """Base class of the response cache backends used by WarframeMarketCore._get."""
+
+    def __init__(self, ttls: list = None, max_bytes: int = 64 * 1024 * 1024):
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls if ttls is not None else DEFAULT_TTLS)]
+        self.max_bytes = max_bytes
+
+    def ttl_for(self, path: str) -> float:
+        """Return the TTL of an endpoint path, or None when its responses shouldn't be cached."""
+        path = path.strip('/')
+        for pattern, ttl in self.ttls:
+            if pattern.fullmatch(path):
+                return ttl
+        return None
+
+    def get(self, key: str) -> CacheEntry:
+        raise NotImplementedError
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def invalidate(self, url: str) -> None:
+        """Drop the entries of url and of every URL below it."""
+        raise NotImplementedError
+
+
+class MemoryCache(ResponseCache):
+    """In-process LRU cache bounded by the total size of the cached bodies."""
+
+    def __init__(self, ttls: list = None, max_bytes: int = 64 * 1024 * 1024):
+        super(MemoryCache, self).__init__(ttls, max_bytes)
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CacheEntry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self._size -= old_entry.size
+            self._entries[key] = entry
+            self._size += entry.size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def invalidate(self, url: str) -> None:
+        prefix = url.rstrip('/') + '/'
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.url == url or entry.url.startswith(prefix)]:
+                self._size -= self._entries.pop(key).size
+
+
+class SqliteCache(ResponseCache):
+    """On-disk cache shared between processes, evicting the least recently used entries past max_bytes."""
+
+    def __init__(self, path: str = 'response_cache.sqlite', ttls: list = None, max_bytes: int = 256 * 1024 * 1024):
+        super(SqliteCache, self).__init__(ttls, max_bytes)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, url TEXT, status_code INTEGER, headers TEXT, content BLOB, '
+            'expires_at REAL, size INTEGER, accessed_at REAL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+
+    def get(self, key: str) -> CacheEntry:
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT url, status_code, headers, content, expires_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (time.time(), key))
+        url, status_code, headers, content, expires_at = row
+        return CacheEntry(url, status_code, json.loads(headers), bytes(content), expires_at)
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, entry.url, entry.status_code, json.dumps(entry.headers), entry.content, entry.expires_at, entry.size, time.time())
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        total = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        cursor = self._connection.execute('SELECT key, size FROM responses ORDER BY accessed_at')
+        evicted = []
+        for key, size in cursor:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._connection.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute('DELETE FROM responses')
+
+    def invalidate(self, url: str) -> None:
+        prefix = url.rstrip('/') + '/'
+        with self._lock:
+            self._connection.execute('DELETE FROM responses WHERE url = ? OR substr(url, 1, ?) = ?', (url, len(prefix), prefix))
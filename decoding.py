@@ -0,0 +1,63 @@
+"""
+JSON decoding of API responses straight from the raw body bytes.
+
+Uses orjson or ujson when installed, falling back to the standard library. Responses of the form
+{"payload": ...} / {"profile": ...} are decoded by parsing only the value of that key.
+"""
+import json
+import re
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover - depends on the environment
+    ujson = None
+
+if orjson is not None:
+    backend = 'orjson'
+    loads = orjson.loads
+    DecodeError = orjson.JSONDecodeError
+    _accepts_memoryview = True
+elif ujson is not None:
+    backend = 'ujson'
+    loads = ujson.loads
+    DecodeError = ValueError
+    _accepts_memoryview = False
+else:
+    backend = 'json'
+    loads = json.loads
+    DecodeError = ValueError
+    _accepts_memoryview = False
+
+_ENVELOPE = re.compile(rb'\s*{\s*"(payload|profile)"\s*:')
+_TRAILER = re.compile(rb'}\s*$')
+
+
+def extract(raw: bytes) -> tuple:
+    """
+    Decode a response body into (key, value): key is 'error', 'payload' or 'profile' with that key's value,
+    or None with the whole document (None for an empty body, e.g. of a 204).
+    """
+    if not raw.strip():
+        return None, None
+    envelope = _ENVELOPE.match(raw)
+    if envelope is not None:
+        trailer = _TRAILER.search(raw, envelope.end())
+        if trailer is not None:
+            # The slice only parses as a single JSON value when the envelope key was the only key of the object
+            body = memoryview(raw)[envelope.end():trailer.start()]
+            try:
+                return envelope.group(1).decode('ascii'), loads(body if _accepts_memoryview else body.tobytes())
+            except DecodeError:
+                pass
+
+    document = loads(raw)
+    if isinstance(document, dict):
+        for key in ('error', 'payload', 'profile'):
+            if key in document:
+                return key, document if key == 'error' else document[key]
+    return None, document
@@ -10,6 +10,20 @@ class WarframeMarketException(Exception):
     pass
 
 
+class UnknownItem(WarframeMarketException):
+    """Raised before any request when an item name can't be resolved against the local catalogue.
+
+    .. attribute:: suggestions
+
+        url names of the closest known items
+    """
+
+    def __init__(self, item, suggestions=()):
+        super(UnknownItem, self).__init__(f'Unknown item {item!r}' + (f', did you mean {", ".join(suggestions)}?' if suggestions else ''))
+        self.item = item
+        self.suggestions = list(suggestions)
+
+
 class WarframeMarketError(WarframeMarketException):
     """The base exception class for all response-related exceptions.
 
@@ -134,6 +148,15 @@ class ClientError(ResponseError):
     pass
 
 
+class TooManyRequests(ResponseError):
+    """Exception class for 429 responses.
+
+    Raised once the client-side rate limiter has run out of retries.
+    """
+
+    pass
+
+
 class ServerError(ResponseError):
     """Exception class for 5xx responses."""
 
@@ -155,6 +178,7 @@ error_classes = {
     406: NotAcceptable,
     409: Conflict,
     422: UnprocessableEntity,
+    429: TooManyRequests,
     451: UnavailableForLegalReasons,
 }
 
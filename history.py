@@ -0,0 +1,157 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from models import logger
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS statistics ('
+    'item TEXT NOT NULL, source TEXT NOT NULL, period TEXT NOT NULL, mod_rank INTEGER NOT NULL, order_type TEXT NOT NULL, '
+    'ts INTEGER NOT NULL, volume INTEGER, min_price REAL, max_price REAL, avg_price REAL, wa_price REAL, median REAL, '
+    'PRIMARY KEY (item, source, period, mod_rank, order_type, ts)) WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS orders ('
+    'item TEXT NOT NULL, order_id TEXT NOT NULL, updated_at INTEGER NOT NULL, captured_at INTEGER NOT NULL, '
+    'order_type TEXT, platinum INTEGER, quantity INTEGER, user TEXT, status TEXT, '
+    'PRIMARY KEY (item, updated_at, order_id)) WITHOUT ROWID',
+)
+
+STATISTIC_COLUMNS = ('volume', 'min_price', 'max_price', 'avg_price', 'wa_price', 'median')
+
+
+def to_timestamp(value) -> int:
+    """Epoch seconds of an API ISO datetime string (or of a datetime / number passed through)."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class PriceHistory:
+    """
+    Embedded sqlite store of item statistics and order snapshots.
+    Rows are keyed by their own timestamps, so re-ingesting overlapping downloads only appends what is new.
+    """
+
+    def __init__(self, path: str = 'price_history.sqlite'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._migrate()
+        for statement in _SCHEMA:
+            self._connection.execute(statement)
+
+    def _migrate(self) -> None:
+        # Stores created before order_type was added lose one of the buy/sell rows of live statistics, rebuild their statistics table
+        columns = [row[1] for row in self._connection.execute('PRAGMA table_info(statistics)')]
+        if not columns or 'order_type' in columns:
+            return
+        self._connection.execute('ALTER TABLE statistics RENAME TO statistics_old')
+        self._connection.execute(_SCHEMA[0])
+        self._connection.execute(
+            "INSERT INTO statistics SELECT item, source, period, mod_rank, '', ts, " + ', '.join(STATISTIC_COLUMNS) + ' FROM statistics_old'
+        )
+        self._connection.execute('DROP TABLE statistics_old')
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _insert(self, statement: str, rows: list) -> int:
+        with self._lock:
+            before = self._connection.total_changes
+            self._connection.execute('BEGIN')
+            try:
+                self._connection.executemany(statement, rows)
+                self._connection.execute('COMMIT')
+            except BaseException:
+                self._connection.execute('ROLLBACK')
+                raise
+            return self._connection.total_changes - before
+
+    def ingest_statistics(self, item: str, payload: dict) -> int:
+        """Store every series of an item statistics payload and return how many new rows were added."""
+        rows = []
+        for source_key, periods in payload.items():
+            source = source_key.replace('statistics_', '')
+            for period, statistics in periods.items():
+                for statistic in statistics:
+                    mod_rank = statistic.get('mod_rank')
+                    rows.append((item, source, period, -1 if mod_rank is None else mod_rank, statistic.get('order_type') or '',
+                                 to_timestamp(statistic['datetime']))
+                                + tuple(statistic.get(column) for column in STATISTIC_COLUMNS))
+        inserted = self._insert(f'INSERT OR IGNORE INTO statistics VALUES ({", ".join("?" * 12)})', rows)
+        logger.debug('Stored %d new statistics rows of %s', inserted, item)
+        return inserted
+
+    def ingest_orders(self, orders: list, item: str = None, captured_at: float = None) -> int:
+        """
+        Store an order snapshot (item orders, or most recent orders which carry their item) and return how many new rows were added.
+        Orders are deduplicated by their last_update, so unchanged orders in repeated snapshots are stored once.
+        """
+        captured_at = int(captured_at if captured_at is not None else time.time())
+        rows = []
+        for order in orders:
+            user = order.get('user') or {}
+            rows.append((
+                item if item is not None else order['item']['url_name'], order['id'],
+                to_timestamp(order.get('last_update')) or captured_at, captured_at, order['order_type'],
+                order['platinum'], order['quantity'], user.get('ingame_name'), user.get('status')
+            ))
+        inserted = self._insert(f'INSERT OR IGNORE INTO orders VALUES ({", ".join("?" * 9)})', rows)
+        logger.debug('Stored %d new order rows', inserted)
+        return inserted
+
+    def latest_statistic(self, item: str, source: str = 'closed', period: str = '90days') -> int:
+        """Timestamp of the newest stored statistic of an item, to skip downloads that would add nothing."""
+        with self._lock:
+            return self._connection.execute(
+                'SELECT MAX(ts) FROM statistics WHERE item = ? AND source = ? AND period = ?', (item, source, period)
+            ).fetchone()[0]
+
+    def _query_frame(self, query: str, parameters: tuple, time_columns: tuple):
+        import pandas as pd
+
+        with self._lock:
+            cursor = self._connection.execute(query, parameters)
+            frame = pd.DataFrame.from_records(cursor.fetchall(), columns=[column[0] for column in cursor.description])
+        for column in time_columns:
+            frame[column] = pd.to_datetime(frame[column], unit='s', utc=True)
+        return frame
+
+    def statistics(self, item: str, start=None, end=None, source: str = 'closed', period: str = '90days'):
+        """
+        Statistics rows of an item with start <= datetime < end, read through the primary key index.
+        order_type is buy/sell for live statistics and missing for closed ones.
+        """
+        frame = self._query_frame(
+            'SELECT ts AS datetime, mod_rank, order_type, ' + ', '.join(STATISTIC_COLUMNS) + ' FROM statistics '
+            'WHERE item = ? AND source = ? AND period = ? AND ts >= ? AND ts < ? ORDER BY mod_rank, order_type, ts',
+            (item, source, period, to_timestamp(start) or 0, to_timestamp(end) or 2 ** 62), ('datetime',)
+        )
+        frame['mod_rank'] = frame['mod_rank'].where(frame['mod_rank'] >= 0).astype('Int8')
+        frame['order_type'] = frame['order_type'].where(frame['order_type'] != '')
+        return frame
+
+    def orders(self, item: str, start=None, end=None, order_type: str = None):
+        """Stored orders of an item last updated in [start, end)."""
+        query = ('SELECT updated_at, captured_at, order_id, order_type, platinum, quantity, user, status FROM orders '
+                 'WHERE item = ? AND updated_at >= ? AND updated_at < ?')
+        parameters = (item, to_timestamp(start) or 0, to_timestamp(end) or 2 ** 62)
+        if order_type is not None:
+            query += ' AND order_type = ?'
+            parameters += (order_type,)
+        return self._query_frame(query + ' ORDER BY updated_at', parameters, ('updated_at', 'captured_at'))
+
+    def daily_price_percentiles(self, item: str, percentiles=(0.1, 0.5, 0.9), start=None, end=None, order_type: str = 'sell'):
+        """Per UTC day percentiles of the platinum price of an item's stored orders, one column per percentile."""
+        orders = self.orders(item, start, end, order_type)
+        orders['platinum'] = orders['platinum'].astype(float)
+        daily = orders.groupby(orders['updated_at'].dt.floor('D'))['platinum'].quantile(list(percentiles)).unstack().reindex(columns=list(percentiles))
+        daily.index.name = 'day'
+        return daily
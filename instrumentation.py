@@ -0,0 +1,176 @@
+"""
+In-process request metrics.
+
+WarframeMarketCore records every HTTP attempt, cache lookup and rate-limiter wait into `WarframeMarketCore.metrics`,
+a RequestMetrics registry which renders itself in the Prometheus text format and forwards a RequestTrace to tracers.
+"""
+import bisect
+import threading
+from collections import namedtuple
+from typing import Callable
+from urllib.parse import urlsplit
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Path segments kept verbatim in endpoint labels, any other segment is a parameter (item, username, order id)
+ENDPOINT_LITERALS = {
+    'items', 'orders', 'statistics', 'dropsources', 'profile', 'order', 'tools', 'ducats', 'most_recent',
+    'auth', 'signin', 'signout', 'achievements', 'reviews', 'settings', 'riven', 'auctions', 'search',
+}
+
+RequestTrace = namedtuple('RequestTrace', ['method', 'url', 'endpoint', 'attempt', 'status_code', 'elapsed', 'wait', 'bytes_sent', 'bytes_received', 'error'])
+
+
+def endpoint_label(url: str, base_url: str = '') -> str:
+    """Low cardinality label of a URL, e.g. 'items/{}/orders' for .../v1/items/ash_prime_set/orders."""
+    path = url[len(base_url):] if base_url and url.startswith(base_url) else urlsplit(url).path
+    path = path.split('?', 1)[0]
+    return '/'.join(part if part in ENDPOINT_LITERALS else '{}' for part in path.split('/') if part)
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{str(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def expose(self) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.samples().items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, as Prometheus expects it."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts (non cumulative, last one is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return series[2] if series is not None else 0
+
+    def sum(self, *labels) -> float:
+        series = self._series.get(labels)
+        return series[1] if series is not None else 0.0
+
+    def quantile(self, q: float, *labels) -> float:
+        """Upper bound of the bucket holding the q-th quantile, inf if it lies past the last bucket."""
+        series = self._series.get(labels)
+        if series is None or not series[2]:
+            return None
+        rank, seen = q * series[2], 0
+        for bound, count in zip(self.buckets + (float('inf'),), series[0]):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def expose(self) -> list:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        for labels, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class RequestMetrics:
+    """
+    Registry of the request metrics. Every metric is labelled by endpoint (see endpoint_label).
+    Tracers are called with a RequestTrace after every attempt, on the thread (or event loop) that made it.
+    """
+
+    def __init__(self, prefix: str = 'warframe_market', buckets: tuple = DEFAULT_BUCKETS):
+        self.duration = Histogram(f'{prefix}_request_duration_seconds', 'Duration of HTTP attempts.', ('method', 'endpoint'), buckets)
+        self.responses = Counter(f'{prefix}_responses_total', 'HTTP responses by status code.', ('method', 'endpoint', 'status'))
+        self.errors = Counter(f'{prefix}_request_errors_total', 'HTTP attempts failing without a response.', ('method', 'endpoint'))
+        self.retries = Counter(f'{prefix}_retries_total', 'Retried HTTP attempts.', ('method', 'endpoint'))
+        self.bytes_sent = Counter(f'{prefix}_request_bytes_total', 'Request body bytes sent.', ('method', 'endpoint'))
+        self.bytes_received = Counter(f'{prefix}_response_bytes_total', 'Response body bytes received.', ('method', 'endpoint'))
+        self.cache = Counter(f'{prefix}_cache_lookups_total', 'Response cache lookups by result (hit, miss, revalidated, coalesced).', ('endpoint', 'result'))
+        self.limiter_wait = Histogram(f'{prefix}_ratelimit_wait_seconds', 'Time spent waiting for the rate limiter.', ('endpoint',), buckets)
+        self.tracers = []
+
+    def _metrics(self) -> tuple:
+        return self.duration, self.responses, self.errors, self.retries, self.bytes_sent, self.bytes_received, self.cache, self.limiter_wait
+
+    def add_tracer(self, callback: Callable) -> None:
+        self.tracers.append(callback)
+
+    def remove_tracer(self, callback: Callable) -> None:
+        self.tracers.remove(callback)
+
+    def observe_attempt(self, trace: RequestTrace) -> None:
+        labels = (trace.method, trace.endpoint)
+        self.duration.observe(trace.elapsed, *labels)
+        if trace.wait:
+            self.limiter_wait.observe(trace.wait, trace.endpoint)
+        if trace.attempt:
+            self.retries.inc(*labels)
+        if trace.error is not None:
+            self.errors.inc(*labels)
+        else:
+            self.responses.inc(*labels, trace.status_code)
+            self.bytes_received.inc(*labels, amount=trace.bytes_received)
+        if trace.bytes_sent:
+            self.bytes_sent.inc(*labels, amount=trace.bytes_sent)
+        for tracer in list(self.tracers):
+            try:
+                tracer(trace)
+            except Exception:
+                from models import logger
+
+                logger.exception('Request tracer %r failed', tracer)
+
+    def observe_cache(self, endpoint: str, result: str) -> None:
+        self.cache.inc(endpoint, result)
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for metric in self._metrics():
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
@@ -1,46 +1,363 @@
 import json
-import pandas as pd
-
-from websocket import create_connection
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
 
 import requests
+from requests.adapters import HTTPAdapter
 
+import cache
+import decoding
 import exceptions
+import instrumentation
+import names
+import ratelimit
+import singleflight
 import utility
 
-logger = utility.create_logger()
+logger = utility.get_logger()
+
+ITEM_DATA_JSON = 'item_data.json'
+ITEM_DATA_TABLE = 'item_data.bin'
+DUCAT_DATA_JSON = 'ducat_data.json'
+DUCAT_DATA_TABLE = 'ducat_data.bin'
+# The ducat data is recomputed hourly, a compiled table younger than this is mapped instead of downloaded again
+DUCAT_DATA_TTL = 3600
+
+_transport_lock = threading.Lock()
+_transport_config = {
+    'pool_connections': 10,
+    'pool_maxsize': 32,
+    'pool_block': False,
+    'max_retries': 0,
+}
+_shared_session = None
+
+
+def configure_transport(**config) -> None:
+    """Configure the shared connection pool (pool_connections, pool_maxsize, pool_block, max_retries)."""
+    global _shared_session
+    unknown = set(config) - set(_transport_config)
+    if unknown:
+        raise ValueError(f'Unknown transport options: {", ".join(sorted(unknown))}')
+
+    with _transport_lock:
+        _transport_config.update(config)
+        old_session, _shared_session = _shared_session, None
+
+    if old_session is not None:
+        old_session.close()
+
+
+def get_shared_session() -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use."""
+    global _shared_session
+    if _shared_session is None:
+        with _transport_lock:
+            if _shared_session is None:
+                _shared_session = _create_pooled_session()
+    return _shared_session
+
+
+def _create_pooled_session() -> requests.Session:
+    session = requests.session()
+    adapter = HTTPAdapter(**_transport_config)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'Content-Type': 'application/json',
+        'Connection': 'keep-alive',
+    })
+    return session
+
+
+def _forget_shared_session() -> None:
+    # A forked child must not reuse the parent's pooled sockets, it opens its own connections on first use
+    global _shared_session, _transport_lock
+    _shared_session = None
+    _transport_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_shared_session)
+
+
+ReferenceChange = namedtuple('ReferenceChange', ['table', 'kind', 'item_id', 'old', 'new'])
+
+
+def diff_reference(table: str, old: dict, new: dict) -> list:
+    """List the added, removed and changed rows between two id -> value mappings."""
+    changes = [ReferenceChange(table, 'removed', item_id, value, None) for item_id, value in old.items() if item_id not in new]
+    for item_id, value in new.items():
+        old_value = old.get(item_id)
+        if old_value is None:
+            changes.append(ReferenceChange(table, 'added', item_id, None, value))
+        elif old_value != value:
+            changes.append(ReferenceChange(table, 'changed', item_id, old_value, value))
+    return changes
+
+
+# Stands in for the name index while no item data has been downloaded, reset with the index when item data is loaded
+_NO_NAME_INDEX = object()
+
+
+class ReferenceData:
+    """Process-wide static item, mod and ducat data shared by every core instance, loaded on first access."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.item_table = None
+        self.item_data = None
+        self.mod_data = None
+        self.name_index = None
+        self.ducat_table = None
+        self.ducat_data = None
+        self.ducat_data_df = None
+        self.ducat_index = None
+        self.ducat_positions = None
+        self.ducats = None
+        self.dpp = None
+        self.listeners = []
 
 
 class WarframeMarketCore:
-    item_data = {}
-    mod_data = []
-    ducat_data = {}
-    ducat_data_df = pd.DataFrame()
-
-    def __init__(self, session=None):
-        self._market_url = 'https://api.warframe.market/v1'
-        self.secret = ''
-        self.session = session if session is not None else self.new_session()
-
-    def _request(self, method: str, *args, **kwargs) -> requests.Response:
-        try:
-            request_method = getattr(self.session, method)
-            return request_method(*args, **kwargs)
-        except (
-                requests.exceptions.ConnectionError,
-                requests.exceptions.Timeout,
-        ) as exc:
-            raise requests.exceptions.ConnectionError(exc)
-        except requests.exceptions.RequestException as exc:
-            raise requests.exceptions.Timeout(exc)
+    reference = ReferenceData()
+    secret = ''
+    _secret_lock = threading.Lock()
+    rate_limiter = ratelimit.RateLimiter()
+    raise_errors = False
+    response_cache = cache.MemoryCache()
+    metrics = instrumentation.RequestMetrics()
+    # Coalesces identical concurrent GETs, None to send every one of them
+    single_flight = singleflight.SingleFlight()
+    # API roots, override them to point the library at another server (e.g. benchmarks/mock_server.py)
+    market_url = 'https://api.warframe.market/v1'
+    ws_url = 'wss://warframe.market/socket'
+
+    def __init__(self, session=None, platform: str = 'pc', language: str = 'en', auth: bool = True):
+        self._market_url = self.market_url
+        self.platform = platform
+        self.language = language
+        self.auth = auth
+        self.session = session if session is not None else self._default_session()
+
+    @staticmethod
+    def _default_session():
+        return get_shared_session()
+
+    @property
+    def item_data(self) -> dict:
+        if self.reference.item_data is None:
+            with self.reference.lock:
+                if self.reference.item_data is None:
+                    self._load_item_data()
+        return self.reference.item_data
+
+    @property
+    def mod_data(self) -> frozenset:
+        if self.reference.mod_data is None:
+            with self.reference.lock:
+                if self.reference.mod_data is None:
+                    self._load_mod_data()
+        return self.reference.mod_data
+
+    @property
+    def name_index(self) -> names.NameIndex:
+        """Name resolution index of the item catalogue and mods, None while no item data has been downloaded."""
+        if self.reference.name_index is None:
+            with self.reference.lock:
+                if self.reference.name_index is None:
+                    try:
+                        table = self.item_data.table
+                    except FileNotFoundError:
+                        # Don't look for the files again on every resolve_item
+                        self.reference.name_index = _NO_NAME_INDEX
+                        return None
+                    try:
+                        mods = self.mod_data
+                    except FileNotFoundError:
+                        mods = ()
+                    self.reference.name_index = names.NameIndex.from_table(table, mods)
+        index = self.reference.name_index
+        return None if index is _NO_NAME_INDEX else index
+
+    def resolve_item(self, item: str) -> str:
+        """
+        url_name of an item given by url_name, id or display name, resolved locally before any request.
+        Unknown items log the closest names and give None, or raise UnknownItem when raise_errors is set.
+        Without downloaded item data the name is only canonicalised.
+        """
+        index = self.name_index
+        if index is None:
+            return names.canonical(item)
+        url_name = index.resolve(item)
+        if url_name is None:
+            suggestions = index.suggest(item)
+            if self.raise_errors:
+                raise exceptions.UnknownItem(item, suggestions)
+            logger.warning('Unknown item %s, closest matches: %s', item, ', '.join(suggestions) or 'none')
+        return url_name
+
+    @property
+    def ducat_data(self) -> dict:
+        """Raw ducats payload. Lookups use the compiled table, so the JSON is only parsed when this is accessed."""
+        reference = self._ducat_reference()
+        if reference.ducat_data is None:
+            with open(DUCAT_DATA_JSON, 'r') as data:
+                reference.ducat_data = json.load(data)
+        return reference.ducat_data
+
+    @property
+    def ducat_data_df(self):
+        return self._ducat_reference().ducat_data_df
+
+    @property
+    def ducat_index(self):
+        return self._ducat_reference().ducat_index
+
+    def _ducat_reference(self) -> ReferenceData:
+        if self.reference.ducat_data_df is None:
+            with self.reference.lock:
+                if self.reference.ducat_data_df is None:
+                    self._refresh_ducat_data()
+        return self.reference
+
+    def _refresh_ducat_data(self) -> None:
+        """Called on first access of the ducat data; Market overrides it to download fresh data."""
+        self._load_ducat_data()
+
+    def _headers(self) -> dict:
+        headers = {
+            'Platform': self.platform,
+            'Language': self.language,
+        }
+        if self.auth:
+            headers['Authorization'] = f'JWT {self._get_secret()}'
+        return headers
+
+    def _request(self, method: str, url: str, *args, **kwargs) -> requests.Response:
+        headers = self._headers()
+        headers.update(kwargs.pop('headers', None) or {})
+        limiter = self.rate_limiter
+        bucket = limiter.bucket(ratelimit.endpoint_family(url, self._market_url)) if limiter is not None else None
+        attempt = 0
+        while True:
+            wait = 0.0
+            if bucket is not None:
+                wait = bucket.reserve()
+                if wait > 0:
+                    time.sleep(wait)
+
+            started = time.perf_counter()
+            try:
+                request_method = getattr(self.session, method)
+                response = request_method(url, *args, headers=headers, **kwargs)
+            except (
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout,
+            ) as exc:
+                self._observe_attempt(method, url, attempt, started, wait, args, error=exc)
+                raise requests.exceptions.ConnectionError(exc)
+            except requests.exceptions.RequestException as exc:
+                self._observe_attempt(method, url, attempt, started, wait, args, error=exc)
+                raise requests.exceptions.Timeout(exc)
+            self._observe_attempt(method, url, attempt, started, wait, args, response=response)
+
+            if bucket is None or not limiter.should_retry(method, response.status_code, attempt):
+                if bucket is not None:
+                    if response.status_code < 400:
+                        bucket.reward()
+                    else:
+                        limiter.throttled(bucket, response)
+                return response
+
+            delay = limiter.backoff(bucket, attempt, response)
+            logger.warning("%s %s returned %s, retrying in %.2fs", method.upper(), url, response.status_code, delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def _observe_attempt(self, method: str, url: str, attempt: int, started: float, wait: float, args: tuple, response=None, error=None) -> None:
+        metrics = self.metrics
+        if metrics is None:
+            return
+        body = args[0] if args else None
+        metrics.observe_attempt(instrumentation.RequestTrace(
+            method, url, instrumentation.endpoint_label(url, self._market_url), attempt,
+            response.status_code if response is not None else None, time.perf_counter() - started, wait,
+            len(body) if isinstance(body, (str, bytes)) else 0, len(response.content) if response is not None else 0, error
+        ))
+
+    def _observe_cache(self, url: str, result: str) -> None:
+        if self.metrics is not None:
+            self.metrics.observe_cache(instrumentation.endpoint_label(url, self._market_url), result)
 
     def _delete(self, url: str, **kwargs) -> requests.Response:
         logger.debug("DELETE %s with %s", url, kwargs)
         return self._request("delete", url, **kwargs)
 
     def _get(self, url: str, **kwargs) -> requests.Response:
-        logger.debug("GET %s with %s", url, kwargs)
-        return self._request("get", url, **kwargs)
+        """
+        GET through the response cache; revalidate=True skips a fresh cache hit but still sends the conditional request.
+        Concurrent GETs of the same URL with the same headers share one request and its decoded payload.
+        """
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("GET %s with %s", url, kwargs)
+        if self.single_flight is None:
+            return self._cached_get(url, **kwargs)
+        key = self._flight_key(url, kwargs)
+        response, shared = self.single_flight.do(key, lambda: singleflight.SharedResponse(self._cached_get(url, **kwargs)))
+        if shared:
+            self._observe_cache(url, 'coalesced')
+        return response
+
+    def _flight_key(self, url: str, kwargs: dict) -> tuple:
+        headers = self._headers()
+        headers.update(kwargs.get('headers') or {})
+        # A revalidating GET must send its own conditional request, not share a plain GET served from the cache
+        return singleflight.flight_key(url, headers) + (bool(kwargs.get('revalidate')),)
+
+    def _cached_get(self, url: str, **kwargs) -> requests.Response:
+        slot = self._cache_slot(url)
+        if slot is None:
+            kwargs.pop('revalidate', None)
+            return self._request("get", url, **kwargs)
+
+        revalidate = kwargs.pop('revalidate', False)
+        entry = slot[0].get(slot[1])
+        if entry is not None and entry.is_fresh() and not revalidate:
+            self._observe_cache(url, 'hit')
+            return cache.CachedResponse(entry)
+        if entry is not None:
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **entry.conditional_headers())
+        response = self._request("get", url, **kwargs)
+        self._observe_cache(url, 'revalidated' if entry is not None and response.status_code == 304 else 'miss')
+        return self._cache_response(slot, entry, response)
+
+    def _cache_slot(self, url: str) -> tuple:
+        """Return the (cache, key, ttl) a GET of url is cached under, or None when it isn't cacheable."""
+        response_cache = self.response_cache
+        if response_cache is None:
+            return None
+        path = url[len(self._market_url):] if url.startswith(self._market_url) else url
+        ttl = response_cache.ttl_for(path)
+        if ttl is None:
+            return None
+        return response_cache, f'{self.platform}:{self.language}:{url}', ttl
+
+    @staticmethod
+    def _cache_response(slot: tuple, entry: cache.CacheEntry, response):
+        response_cache, key, ttl = slot
+        if entry is not None and response.status_code == 304:
+            entry.expires_at = time.time() + ttl
+            response_cache.set(key, entry)
+            return cache.CachedResponse(entry)
+        if response.status_code == 200:
+            entry = cache.CacheEntry.from_response(response, ttl)
+            response_cache.set(key, entry)
+            return cache.CachedResponse(entry)
+        return response
 
     def _patch(self, url: str, data=None, json_: bool = True, **kwargs) -> requests.Response:
         if json_:
@@ -61,86 +378,204 @@ class WarframeMarketCore:
         return self._request("put", url, data, **kwargs)
 
     def _get_secret(self) -> str:
-        if self.secret == '':
-            try:
-                with open(f'secret.txt') as secret_file:
-                    self.secret = secret_file.read()
-            except IOError:
-                self.secret = input('Enter secret: ')
-                with open(f'secret.txt', 'w+') as secret_file:
-                    secret_file.write(self.secret)
-
-        return self.secret
+        if WarframeMarketCore.secret == '':
+            with self._secret_lock:
+                if WarframeMarketCore.secret == '':
+                    try:
+                        with open(f'secret.txt') as secret_file:
+                            secret = secret_file.read()
+                    except IOError:
+                        secret = input('Enter secret: ')
+                        with open(f'secret.txt', 'w+') as secret_file:
+                            secret_file.write(secret)
+                    WarframeMarketCore.secret = secret
+
+        return WarframeMarketCore.secret
 
     def _build_url(self, *args, **kwargs):
         normalize = kwargs.get('normalize', False)
         parts = [kwargs.get('base_url', self._market_url)]
-        parts.extend(args)
-        parts = [str(p).lower().replace(' ', '_') if normalize else str(p) for p in parts]
+        parts.extend(names.canonical(p) if normalize else str(p) for p in args)
 
         return '/'.join(parts)
 
     @staticmethod
-    def _json(response: requests.Response, expected_status_code: int) -> dict:
-        decoded_json = response.json()
-
+    def _json(response: requests.Response, expected_status_code: int, strict: bool = False) -> dict:
+        """
+        Decode the payload of a response. Client errors return None unless strict, throttling and server errors always raise.
+        Other unexpected statuses (e.g. 201 or 204) are only logged, strict or not.
+        """
         status_code = response.status_code
 
         if status_code != expected_status_code:
+            if status_code == 429 or status_code >= 500 or (strict and status_code >= 400):
+                raise exceptions.generate_error(response)
             if status_code >= 400:
                 return None
-                # raise exceptions.generate_error(response)
 
-            logger.warning(f'Expected status code {expected_status_code} but got {status_code}')
+            logger.warning('Expected status code %s but got %s', expected_status_code, status_code)
 
-        if 'error' in decoded_json:
-            logger.error(f'Request returned an error: {decoded_json}')
-            raise Exception(f'Request returned an error: {decoded_json}')
+        # Cached responses memoize their extraction, anything else is decoded from the raw body
+        extract = getattr(response, 'extract', None)
+        key, decoded_json = extract() if extract is not None else decoding.extract(response.content)
 
-        if 'payload' in decoded_json:
-            return decoded_json['payload']
+        if key == 'error':
+            logger.error('Request returned an error: %s', decoded_json)
+            raise Exception(f'Request returned an error: {decoded_json}')
 
-        if 'profile' in decoded_json:
-            return decoded_json['profile']
+        if key is not None:
+            return decoded_json
 
         logger.warning('Request returned an empty response')
         return {}
 
+    def _websocket(self):
+        """Return the shared, auto-reconnecting websocket connection of this instance's platform."""
+        from websocket_manager import WebSocketManager
+
+        return WebSocketManager.for_platform(self.platform, lambda: [f'Authorization: JWT {self._get_secret()}'], self.ws_url)
+
     def _open_ws(self, platform: str = 'pc'):
+        from websocket import create_connection
+
         logger.debug('Opening websocket connection')
-        return create_connection(f'wss://warframe.market/socket?platform={platform}', timeout=30, header=[f'Authorization: JWT {self.secret}'])
+        return create_connection(f'{self.ws_url}?platform={platform}', timeout=30, header=[f'Authorization: JWT {self._get_secret()}'])
+
+    @staticmethod
+    def _needs_compiling(json_path: str, table_path: str) -> bool:
+        if not os.path.exists(table_path):
+            return True
+        return os.path.exists(json_path) and os.path.getmtime(json_path) > os.path.getmtime(table_path)
 
     def _load_item_data(self) -> None:
-        with open('item_data.json', 'r') as data:
-            data_json = json.load(data)
-            for item in data_json['items']['en']:
-                self.item_data[item['id']] = item['url_name']
-        logger.info('Loaded item data')
+        import refdata
+
+        if self._needs_compiling(ITEM_DATA_JSON, ITEM_DATA_TABLE):
+            with open(ITEM_DATA_JSON, 'r') as data:
+                data_json = json.load(data)
+            refdata.compile_item_data(ITEM_DATA_TABLE, data_json['items']['en'], refdata.payload_version(data_json))
+            logger.info('Compiled item data')
+
+        table = refdata.ReferenceTable(ITEM_DATA_TABLE)
+        if not table.has_column('item_name') and os.path.exists(ITEM_DATA_JSON):
+            # Compiled before display names were stored
+            with open(ITEM_DATA_JSON, 'r') as data:
+                data_json = json.load(data)
+            refdata.compile_item_data(ITEM_DATA_TABLE, data_json['items']['en'], refdata.payload_version(data_json))
+            table = refdata.ReferenceTable(ITEM_DATA_TABLE)
+        self.reference.item_table = table
+        self.reference.item_data = refdata.ItemNames(table)
+        self.reference.name_index = None
+        logger.info('Loaded item data version %s', table.version)
 
     def _load_mod_data(self) -> None:
         with open('Mods.json', 'r', encoding='utf8') as data:
             data_json = json.load(data)
-            for item in data_json:
-                self.mod_data.append(item['name'])
-                # self.mod_data[item['name']] = item['rarity']
+        self.reference.mod_data = frozenset(item['name'] for item in data_json)
         logger.info('Loaded mod data')
 
     def _load_ducat_data(self) -> None:
-        with open('ducat_data.json', 'r') as data:
-            row_list = []
-            self.ducat_data = json.load(data)
-            for item in self.ducat_data['previous_hour']:
-                row_list.append({'id': item['item'], 'ducats': item['ducats'], 'dpp': item['ducats_per_platinum_wa']})
-            self.ducat_data_df = pd.DataFrame(row_list, columns=['id', 'ducats', 'dpp'])
-            self.ducat_data_df.sort_values('dpp', ascending=False, inplace=True)
-            self.ducat_data_df.reset_index(inplace=True, drop=True)
-        logger.info('Loaded ducat data')
+        import pandas as pd
+        import refdata
+
+        ducat_data = None
+        if self._needs_compiling(DUCAT_DATA_JSON, DUCAT_DATA_TABLE):
+            with open(DUCAT_DATA_JSON, 'r') as data:
+                ducat_data = json.load(data)
+            refdata.compile_ducat_data(DUCAT_DATA_TABLE, ducat_data['previous_hour'], refdata.payload_version(ducat_data))
+            logger.info('Compiled ducat data')
+
+        table = refdata.ReferenceTable(DUCAT_DATA_TABLE)
+        # The table is stored sorted by dpp, the numeric columns are zero-copy views of the mapping
+        ducat_data_df = pd.DataFrame({
+            'id': table.array('id').astype(str),
+            'ducats': table.array('ducats'),
+            'dpp': table.array('dpp'),
+        }, copy=False)
+        self.reference.ducat_table = table
+        self.reference.ducat_data = ducat_data
+        self._index_ducat_data(ducat_data_df)
+        logger.info('Loaded ducat data version %s', table.version)
+
+    def _index_ducat_data(self, ducat_data_df) -> None:
+        import pandas as pd
+
+        reference = self.reference
+        ids = ducat_data_df['id'].to_numpy()
+        reference.ducat_index = pd.Index(ids)
+        reference.ducat_positions = dict(zip(ids, range(len(ids))))
+        reference.ducats = ducat_data_df['ducats'].to_numpy()
+        reference.dpp = ducat_data_df['dpp'].to_numpy()
+        reference.ducat_data_df = ducat_data_df
+
+    def _ducat_rows(self) -> dict:
+        reference = self._ducat_reference()
+        return dict(zip(reference.ducat_index, zip(reference.ducats.tolist(), reference.dpp.tolist())))
+
+    def _patch_ducat_data(self, changes: list) -> None:
+        """Apply ducat ReferenceChanges to the loaded frame and indexes without re-reading the table."""
+        import numpy as np
+        import pandas as pd
+
+        reference = self._ducat_reference()
+        if all(change.kind == 'changed' for change in changes):
+            # Patch copies, readers holding the current frame keep a consistent snapshot
+            ducats = reference.ducats.copy()
+            dpp = reference.dpp.copy()
+            for change in changes:
+                position = reference.ducat_positions[change.item_id]
+                ducats[position], dpp[position] = change.new
+            ids = reference.ducat_data_df['id'].to_numpy()
+        else:
+            rows = self._ducat_rows()
+            for change in changes:
+                if change.kind == 'removed':
+                    rows.pop(change.item_id, None)
+                else:
+                    rows[change.item_id] = change.new
+            ids = np.array(list(rows), dtype=object)
+            ducats = np.array([row[0] for row in rows.values()], dtype='<i4')
+            dpp = np.array([row[1] for row in rows.values()], dtype='<f8')
+
+        order = np.argsort(-dpp, kind='stable')
+        self._index_ducat_data(pd.DataFrame({'id': ids[order], 'ducats': ducats[order], 'dpp': dpp[order]}))
+
+    @classmethod
+    def subscribe_reference_changes(cls, callback) -> None:
+        """Call callback(changes) with a list of ReferenceChange whenever a refresh modifies item or ducat data."""
+        cls.reference.listeners.append(callback)
+
+    @classmethod
+    def unsubscribe_reference_changes(cls, callback) -> None:
+        cls.reference.listeners.remove(callback)
+
+    def _emit_reference_changes(self, changes: list) -> None:
+        if not changes:
+            return
+        for callback in list(self.reference.listeners):
+            try:
+                callback(changes)
+            except Exception:
+                logger.exception('Reference data listener %r failed', callback)
 
     def get_item_name_by_id(self, item_id: str) -> str:
         return self.item_data[item_id]
 
+    def reload_reference_data(self) -> bool:
+        """Re-map the compiled item and ducat tables if another process published newer ones. Returns whether anything was reloaded."""
+        reloaded = False
+        with self.reference.lock:
+            if self.reference.item_table is not None and self.reference.item_table.is_stale():
+                self._load_item_data()
+                reloaded = True
+            if self.reference.ducat_table is not None and self.reference.ducat_table.is_stale():
+                self._load_ducat_data()
+                reloaded = True
+        return reloaded
+
     def new_session(self, platform='pc', language='en', auth=True):
-        session = requests.session()
+        """Build a standalone pooled session with baked-in headers, bypassing the shared transport."""
+        session = _create_pooled_session()
         session.headers.update({
             'Platform': platform,
             'Language': language,
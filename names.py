@@ -0,0 +1,183 @@
+"""
+Local resolution of item and mod names.
+
+Every name is reduced to a canonical key (accents stripped, lowercase, apostrophes dropped, other punctuation and
+spaces collapsed to '_'), which is what warframe.market url names look like, so 'Ash Prime Set', 'ash prime set'
+and 'ash_prime_set' all resolve to the same item without a request.
+"""
+import re
+import unicodedata
+from typing import Iterable
+
+_APOSTROPHES = re.compile(r"['’`]")
+_SEPARATORS = re.compile(r'[^0-9a-z]+')
+
+
+def canonical(name: str) -> str:
+    name = unicodedata.normalize('NFKD', str(name))
+    name = ''.join(character for character in name if not unicodedata.combining(character)).lower()
+    name = _APOSTROPHES.sub('', name.replace('&', ' and '))
+    return _SEPARATORS.sub('_', name).strip('_')
+
+
+class Trie:
+    """Prefix tree of canonical keys. Each node is a dict of child characters; the None key of a terminal node holds (key, values)."""
+
+    __slots__ = ('_root', '_size')
+
+    def __init__(self):
+        self._root = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, key: str, value) -> None:
+        node = self._root
+        for character in key:
+            node = node.setdefault(character, {})
+        terminal = node.get(None)
+        if terminal is None:
+            node[None] = (key, [value])
+            self._size += 1
+        elif value not in terminal[1]:
+            terminal[1].append(value)
+
+    def get(self, key: str) -> list:
+        node = self._root
+        for character in key:
+            node = node.get(character)
+            if node is None:
+                return []
+        terminal = node.get(None)
+        return list(terminal[1]) if terminal is not None else []
+
+    def prefix(self, prefix: str, limit: int = None) -> list:
+        """(key, values) of the keys starting with prefix, shortest keys first."""
+        node = self._root
+        for character in prefix:
+            node = node.get(character)
+            if node is None:
+                return []
+        matches = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for character, child in node.items():
+                if character is None:
+                    matches.append(child)
+                else:
+                    stack.append(child)
+        matches.sort(key=lambda match: (len(match[0]), match[0]))
+        return matches[:limit]
+
+    def fuzzy(self, key: str, max_distance: int = 2) -> list:
+        """
+        (distance, key, values) of the keys within max_distance edits (Levenshtein) of key, closest first.
+        Walks the trie carrying one row of the edit distance table per node and prunes branches whose row minimum exceeds max_distance.
+        """
+        matches = []
+        first_row = list(range(len(key) + 1))
+        stack = [(child, character, first_row) for character, child in self._root.items() if character is not None]
+        terminal = self._root.get(None)
+        if terminal is not None and len(key) <= max_distance:
+            matches.append((len(key), terminal[0], list(terminal[1])))
+        while stack:
+            node, character, previous_row = stack.pop()
+            row = [previous_row[0] + 1]
+            for column in range(1, len(key) + 1):
+                row.append(min(
+                    row[column - 1] + 1,
+                    previous_row[column] + 1,
+                    previous_row[column - 1] + (key[column - 1] != character),
+                ))
+            terminal = node.get(None)
+            if terminal is not None and row[-1] <= max_distance:
+                matches.append((row[-1], terminal[0], list(terminal[1])))
+            if min(row) <= max_distance:
+                stack.extend((child, next_character, row) for next_character, child in node.items() if next_character is not None)
+        matches.sort(key=lambda match: (match[0], len(match[1]), match[1]))
+        return matches
+
+
+class NameIndex:
+    """
+    Bidirectional id <-> url_name <-> display name maps of the item catalogue plus the set of mod names,
+    with exact, prefix and fuzzy lookup of any spelling through a trie of canonical names.
+    """
+
+    def __init__(self, items: Iterable[tuple], mods: Iterable[str] = ()):
+        """items are (id, url_name, display name) tuples."""
+        self.url_names = {}
+        self.ids = {}
+        self.display_names = {}
+        self._trie = Trie()
+        for item_id, url_name, display_name in items:
+            display_name = display_name or url_name
+            self.url_names[item_id] = url_name
+            self.ids[url_name] = item_id
+            self.display_names[url_name] = display_name
+            self._trie.insert(canonical(url_name), url_name)
+            self._trie.insert(canonical(display_name), url_name)
+        self.mods = frozenset(canonical(mod) for mod in mods)
+
+    @classmethod
+    def from_table(cls, table, mods: Iterable[str] = ()) -> 'NameIndex':
+        """Build from a compiled item table (see refdata.compile_item_data); tables without display names use url names."""
+        ids = (item_id.decode('ascii') for item_id in table.array('id'))
+        url_names = list(table.strings('url_name'))
+        display_names = table.strings('item_name') if table.has_column('item_name') else url_names
+        return cls(zip(ids, url_names, display_names), mods)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, name) -> bool:
+        return self.resolve(name) is not None
+
+    def resolve(self, name: str) -> str:
+        """url_name of an item given as url_name, id or display name in any case/punctuation, None when unknown."""
+        if name in self.ids:
+            return name
+        url_name = self.url_names.get(name)
+        if url_name is not None:
+            return url_name
+        url_names = self._trie.get(canonical(name))
+        return url_names[0] if url_names else None
+
+    def id_of(self, name: str) -> str:
+        url_name = self.resolve(name)
+        return self.ids[url_name] if url_name is not None else None
+
+    def display_name(self, name: str) -> str:
+        url_name = self.resolve(name)
+        return self.display_names[url_name] if url_name is not None else None
+
+    def is_mod(self, name: str) -> bool:
+        key = canonical(name)
+        if key in self.mods:
+            return True
+        url_name = self.resolve(name)
+        return url_name is not None and canonical(self.display_names[url_name]) in self.mods
+
+    def prefix(self, text: str, limit: int = 10) -> list:
+        """url_names of the items whose url or display name starts with text, shortest names first."""
+        url_names = []
+        for _, values in self._trie.prefix(canonical(text)):
+            url_names.extend(value for value in values if value not in url_names)
+            if len(url_names) >= limit:
+                break
+        return url_names[:limit]
+
+    def fuzzy(self, text: str, max_distance: int = 2, limit: int = 5) -> list:
+        """url_names of the items within max_distance edits of text, closest first."""
+        url_names = []
+        for _, _, values in self._trie.fuzzy(canonical(text), max_distance):
+            url_names.extend(value for value in values if value not in url_names)
+            if len(url_names) >= limit:
+                break
+        return url_names[:limit]
+
+    def suggest(self, text: str, limit: int = 5) -> list:
+        """Completions of text, or its closest spellings when nothing starts with it."""
+        return self.prefix(text, limit) or self.fuzzy(text, limit=limit)
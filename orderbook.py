@@ -0,0 +1,197 @@
+import asyncio
+import threading
+from bisect import bisect_left, insort
+from collections import namedtuple
+from typing import AsyncIterator, Callable, Iterable
+
+from models import logger
+from records import OrderRecord
+
+SUBSCRIBE_MOST_RECENT = '@WS/SUBSCRIBE/MOST_RECENT'
+UNSUBSCRIBE_MOST_RECENT = '@WS/UNSUBSCRIBE/MOST_RECENT'
+NEW_ORDER = '@WS/SUBSCRIPTIONS/MOST_RECENT/NEW_ORDER'
+
+OrderBookEvent = namedtuple('OrderBookEvent', ['kind', 'item', 'order'])
+
+
+class OrderBook:
+    """
+    Orders of one item kept in price-sorted levels.
+    Best bid/ask and depth queries read the ends of the sorted lists, updates are a binary search plus a list insert/delete.
+    """
+
+    def __init__(self, item: str):
+        self.item = item
+        self.orders = {}
+        # Both sides are sorted best first: asks by price, bids by negated price
+        self._asks = []
+        self._bids = []
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def _side(self, order: OrderRecord) -> tuple:
+        if order.order_type == 'sell':
+            return self._asks, (order.platinum, order.id)
+        return self._bids, (-order.platinum, order.id)
+
+    def apply(self, order: OrderRecord) -> str:
+        """Insert or update an order and return the event kind, 'added' or 'changed' (None if nothing changed)."""
+        previous = self.orders.get(order.id)
+        if previous == order:
+            return None
+        if previous is not None:
+            self._unlink(previous)
+        self.orders[order.id] = order
+        if order.visible:
+            levels, key = self._side(order)
+            insort(levels, key)
+        return 'added' if previous is None else 'changed'
+
+    def remove(self, order_id: str) -> OrderRecord:
+        order = self.orders.pop(order_id, None)
+        if order is not None:
+            self._unlink(order)
+        return order
+
+    def _unlink(self, order: OrderRecord) -> None:
+        levels, key = self._side(order)
+        position = bisect_left(levels, key)
+        if position < len(levels) and levels[position] == key:
+            del levels[position]
+
+    def best_ask(self) -> OrderRecord:
+        return self.orders[self._asks[0][1]] if self._asks else None
+
+    def best_bid(self) -> OrderRecord:
+        return self.orders[self._bids[0][1]] if self._bids else None
+
+    def asks(self, depth: int = None) -> list:
+        return [self.orders[order_id] for _, order_id in self._asks[:depth]]
+
+    def bids(self, depth: int = None) -> list:
+        return [self.orders[order_id] for _, order_id in self._bids[:depth]]
+
+    def spread(self) -> int:
+        ask, bid = self.best_ask(), self.best_bid()
+        return ask.platinum - bid.platinum if ask is not None and bid is not None else None
+
+
+class OrderBookFeed:
+    """
+    Live order books built from item order snapshots and the websocket most recent orders subscription.
+
+    The subscription only announces new orders, so changes and removals come from `resync(item)`,
+    which diffs a fresh snapshot against the book. Books and the item_id of their records use the item's url_name.
+    Events reach callbacks (on the websocket thread) and `stream()` async iterators.
+    """
+
+    def __init__(self, market, items: Iterable[str] = None):
+        self.market = market
+        self.items = set(items) if items is not None else None
+        self.books = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._websocket = None
+        self._subscribed = False
+
+    def book(self, item: str) -> OrderBook:
+        book = self.books.get(item)
+        if book is None:
+            book = self.books.setdefault(item, OrderBook(item))
+        return book
+
+    def start(self) -> 'OrderBookFeed':
+        """Load a snapshot of every tracked item and subscribe to new orders."""
+        for item in self.items or ():
+            self.resync(item)
+        self._websocket = self.market._websocket()
+        self._websocket.on(NEW_ORDER, self._on_new_order)
+        self._subscribed = False
+        self._websocket.on_connect(self._on_connect)
+        if self._websocket.connected:
+            # Otherwise _on_connect subscribes once the connection is up
+            self._subscribed = True
+            self._websocket.send(SUBSCRIBE_MOST_RECENT)
+        return self
+
+    def stop(self) -> None:
+        if self._websocket is not None:
+            self._websocket.off(NEW_ORDER, self._on_new_order)
+            self._websocket.off_connect(self._on_connect)
+            self._websocket.send(UNSUBSCRIBE_MOST_RECENT)
+            self._websocket = None
+
+    def add_listener(self, callback: Callable) -> None:
+        """Call callback(OrderBookEvent) for every added, changed or removed order."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable) -> None:
+        self._listeners.remove(callback)
+
+    def resync(self, item: str) -> None:
+        """Reconcile the book of item with a fresh order snapshot."""
+        payload = self.market.get_item_orders(item)
+        if payload is None:
+            logger.warning('Could not resync the order book of %s', item)
+            return
+        snapshot = {order['id']: OrderRecord.from_json(order, item) for order in payload['orders']}
+        with self._lock:
+            book = self.book(item)
+            events = [OrderBookEvent('removed', item, book.remove(order_id)) for order_id in list(book.orders) if order_id not in snapshot]
+            for order in snapshot.values():
+                kind = book.apply(order)
+                if kind is not None:
+                    events.append(OrderBookEvent(kind, item, order))
+        self._emit(events)
+
+    def _on_connect(self) -> None:
+        """A new connection has no subscriptions: subscribe again and, after a reconnect, resync the orders missed during the gap."""
+        websocket = self._websocket
+        if websocket is None:
+            return
+        websocket.send(SUBSCRIBE_MOST_RECENT)
+        if self._subscribed:
+            threading.Thread(target=self._resync_all, name='order-book-resync', daemon=True).start()
+        self._subscribed = True
+
+    def _resync_all(self) -> None:
+        for item in list(self.items if self.items is not None else self.books):
+            try:
+                self.resync(item)
+            except Exception:
+                logger.exception('Resyncing the order book of %s failed', item)
+
+    def _on_new_order(self, payload: dict) -> None:
+        order_json = payload['order']
+        item = order_json['item']['url_name']
+        if self.items is not None and item not in self.items:
+            return
+        order = OrderRecord.from_json(order_json, item)
+        with self._lock:
+            kind = self.book(item).apply(order)
+        if kind is not None:
+            self._emit([OrderBookEvent(kind, item, order)])
+
+    def _emit(self, events: list) -> None:
+        for event in events:
+            for callback in list(self._listeners):
+                try:
+                    callback(event)
+                except Exception:
+                    logger.exception('Order book listener %r failed', callback)
+
+    async def stream(self) -> AsyncIterator[OrderBookEvent]:
+        """Yield order book events in the running event loop until the consumer stops iterating."""
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def forward(event: OrderBookEvent) -> None:
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        self.add_listener(forward)
+        try:
+            while True:
+                yield await events.get()
+        finally:
+            self.remove_listener(forward)
@@ -0,0 +1,122 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+IDEMPOTENT_METHODS = {'get', 'put', 'delete'}
+THROTTLE_STATUS_CODES = {429, 503}
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def endpoint_family(url: str, base_url: str = '') -> str:
+    """Return the first path segment after the API root, e.g. 'items' for .../v1/items/ash_prime_set/orders."""
+    path = url[len(base_url):] if base_url and url.startswith(base_url) else urlsplit(url).path
+    parts = [part for part in path.split('/') if part]
+    return parts[0] if parts else ''
+
+
+def parse_retry_after(value) -> float:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket with additive-increase/multiplicative-decrease of its rate.
+    reserve() never sleeps itself, it returns how long the caller has to wait, so the same bucket serves threads and coroutines.
+    """
+
+    def __init__(self, rate: float, capacity: float = None, min_rate: float = None):
+        self.max_rate = float(rate)
+        self.min_rate = float(min_rate) if min_rate is not None else self.max_rate / 16
+        self.rate = self.max_rate
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.max_rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def penalize(self, pause: float = None) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate / 2)
+            if pause:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+
+    def reward(self) -> None:
+        if self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class RateLimiter:
+    """Per endpoint family token buckets plus the retry policy applied by WarframeMarketCore._request."""
+
+    default_rates = {
+        'items': 3.0,
+        'profile': 3.0,
+        'tools': 1.0,
+    }
+
+    def __init__(self, rates: dict = None, default_rate: float = 3.0, burst: float = None, max_retries: int = 3, backoff_base: float = 0.5, backoff_cap: float = 30.0):
+        self.rates = dict(self.default_rates, **(rates or {}))
+        self.default_rate = default_rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, family: str) -> TokenBucket:
+        bucket = self._buckets.get(family)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(family)
+                if bucket is None:
+                    bucket = TokenBucket(self.rates.get(family, self.default_rate), self.burst)
+                    self._buckets[family] = bucket
+        return bucket
+
+    def should_retry(self, method: str, status_code: int, attempt: int) -> bool:
+        if attempt >= self.max_retries or status_code not in RETRY_STATUS_CODES:
+            return False
+        # The server never processed a throttled request, anything else is only safe to replay when idempotent
+        return status_code == 429 or method in IDEMPOTENT_METHODS
+
+    def throttled(self, bucket: TokenBucket, response):
+        """Slow the bucket down when response was throttled, including the last attempt. Returns the Retry-After delay, if any."""
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if response.status_code in THROTTLE_STATUS_CODES:
+            bucket.penalize(retry_after)
+        return retry_after
+
+    def backoff(self, bucket: TokenBucket, attempt: int, response) -> float:
+        """Throttle the bucket after a failed attempt and return how long to wait before retrying."""
+        retry_after = self.throttled(bucket, response)
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
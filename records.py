@@ -0,0 +1,213 @@
+"""
+Compact model objects for API payloads.
+
+Records are `__slots__` classes holding only the fields the library uses, with repeated strings interned.
+OrderTable stores a whole order book as typed numpy columns and only materialises OrderRecords on access.
+"""
+import sys
+from typing import Iterable
+
+import numpy as np
+
+ORDER_TYPES = ('sell', 'buy')
+USER_STATUSES = ('offline', 'online', 'ingame')
+
+_intern = sys.intern
+
+
+def _intern_or_none(value):
+    return _intern(value) if isinstance(value, str) else value
+
+
+class Record:
+    __slots__ = ()
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.astuple() == other.astuple()
+
+    def __hash__(self) -> int:
+        return hash(self.astuple())
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'{type(self).__name__}({fields})'
+
+    def astuple(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+
+class UserRecord(Record):
+    __slots__ = ('id', 'ingame_name', 'status', 'region', 'reputation')
+
+    def __init__(self, id: str, ingame_name: str, status: str, region: str = None, reputation: int = 0):
+        self.id = id
+        self.ingame_name = ingame_name
+        self.status = _intern_or_none(status)
+        self.region = _intern_or_none(region)
+        self.reputation = reputation
+
+    @classmethod
+    def from_json(cls, user_json: dict) -> 'UserRecord':
+        return cls(user_json.get('id'), user_json.get('ingame_name'), user_json.get('status'), user_json.get('region'), user_json.get('reputation', 0))
+
+
+class ItemRecord(Record):
+    __slots__ = ('id', 'url_name', 'item_name', 'ducats')
+
+    def __init__(self, id: str, url_name: str, item_name: str = None, ducats: int = None):
+        self.id = _intern(id)
+        self.url_name = _intern(url_name)
+        self.item_name = item_name
+        self.ducats = ducats
+
+    @classmethod
+    def from_json(cls, item_json: dict) -> 'ItemRecord':
+        item_name = item_json.get('item_name') or (item_json.get('en') or {}).get('item_name')
+        return cls(item_json['id'], item_json['url_name'], item_name, item_json.get('ducats'))
+
+
+class OrderRecord(Record):
+    __slots__ = ('id', 'item_id', 'order_type', 'platinum', 'quantity', 'visible', 'mod_rank', 'user', 'status')
+
+    def __init__(self, id: str, item_id: str, order_type: str, platinum: int, quantity: int, visible: bool = True, mod_rank: int = None, user: str = None, status: str = None):
+        self.id = id
+        self.item_id = _intern_or_none(item_id)
+        self.order_type = _intern(order_type)
+        self.platinum = platinum
+        self.quantity = quantity
+        self.visible = visible
+        self.mod_rank = mod_rank
+        self.user = _intern_or_none(user)
+        self.status = _intern_or_none(status)
+
+    @classmethod
+    def from_json(cls, order_json: dict, item_id: str = None) -> 'OrderRecord':
+        """Build a record from an order JSON; item_id, when given, overrides the id of the order's item block (which item order lists lack)."""
+        user = order_json.get('user') or {}
+        if item_id is None and order_json.get('item'):
+            item_id = order_json['item']['id']
+        return cls(
+            order_json['id'], item_id, order_json['order_type'], order_json['platinum'],
+            order_json['quantity'], order_json.get('visible', True), order_json.get('mod_rank'),
+            user.get('ingame_name'), user.get('status')
+        )
+
+
+class StatisticsRecord(Record):
+    __slots__ = ('datetime', 'volume', 'min_price', 'max_price', 'avg_price', 'median', 'wa_price', 'mod_rank')
+
+    def __init__(self, datetime: str, volume: int, min_price: float, max_price: float, avg_price: float, median: float, wa_price: float = None, mod_rank: int = None):
+        self.datetime = datetime
+        self.volume = volume
+        self.min_price = min_price
+        self.max_price = max_price
+        self.avg_price = avg_price
+        self.median = median
+        self.wa_price = wa_price
+        self.mod_rank = mod_rank
+
+    @classmethod
+    def from_json(cls, statistic_json: dict) -> 'StatisticsRecord':
+        get = statistic_json.get
+        return cls(get('datetime'), get('volume'), get('min_price'), get('max_price'), get('avg_price'), get('median'), get('wa_price'), get('mod_rank'))
+
+
+class OrderTable:
+    """
+    Column-oriented order book: typed numpy arrays plus interned string columns.
+    Order type and user status are stored as small integer codes into ORDER_TYPES and USER_STATUSES.
+    """
+
+    def __init__(self, ids, item_ids, order_types, platinum, quantity, visible, mod_ranks, users, statuses):
+        self.ids = ids
+        self.item_ids = item_ids
+        self.order_types = order_types
+        self.platinum = platinum
+        self.quantity = quantity
+        self.visible = visible
+        self.mod_ranks = mod_ranks
+        self.users = users
+        self.statuses = statuses
+
+    @classmethod
+    def from_orders(cls, orders: Iterable[dict], item_id: str = None) -> 'OrderTable':
+        """Build the columns straight from order JSON without creating per-order objects; item_id works as in OrderRecord.from_json."""
+        orders = list(orders)
+        item_id = _intern_or_none(item_id)
+        type_codes = {name: code for code, name in enumerate(ORDER_TYPES)}
+        status_codes = {name: code for code, name in enumerate(USER_STATUSES)}
+        count = len(orders)
+        ids = np.empty(count, dtype=object)
+        item_ids = np.empty(count, dtype=object)
+        users = np.empty(count, dtype=object)
+        order_types = np.empty(count, dtype=np.int8)
+        statuses = np.empty(count, dtype=np.int8)
+        platinum = np.empty(count, dtype=np.int32)
+        quantity = np.empty(count, dtype=np.int32)
+        visible = np.empty(count, dtype=bool)
+        mod_ranks = np.empty(count, dtype=np.int8)
+        for row, order in enumerate(orders):
+            user = order.get('user') or {}
+            item = order.get('item')
+            ids[row] = order['id']
+            item_ids[row] = item_id if item_id is not None or not item else _intern(item['id'])
+            users[row] = _intern_or_none(user.get('ingame_name'))
+            order_types[row] = type_codes[order['order_type']]
+            statuses[row] = status_codes.get(user.get('status'), -1)
+            platinum[row] = order['platinum']
+            quantity[row] = order['quantity']
+            visible[row] = order.get('visible', True)
+            mod_rank = order.get('mod_rank')
+            mod_ranks[row] = -1 if mod_rank is None else mod_rank
+        return cls(ids, item_ids, order_types, platinum, quantity, visible, mod_ranks, users, statuses)
+
+    @classmethod
+    def concat(cls, tables: Iterable['OrderTable']) -> 'OrderTable':
+        tables = list(tables)
+        if not tables:
+            return cls.from_orders([])
+        columns = ('ids', 'item_ids', 'order_types', 'platinum', 'quantity', 'visible', 'mod_ranks', 'users', 'statuses')
+        return cls(*(np.concatenate([getattr(table, column) for table in tables]) for column in columns))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, row: int) -> OrderRecord:
+        mod_rank = int(self.mod_ranks[row])
+        status = int(self.statuses[row])
+        return OrderRecord(
+            self.ids[row], self.item_ids[row], ORDER_TYPES[self.order_types[row]], int(self.platinum[row]),
+            int(self.quantity[row]), bool(self.visible[row]), None if mod_rank < 0 else mod_rank,
+            self.users[row], USER_STATUSES[status] if status >= 0 else None
+        )
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+    def take(self, rows) -> 'OrderTable':
+        """Select rows by index array or boolean mask."""
+        return OrderTable(*(column[rows] for column in (
+            self.ids, self.item_ids, self.order_types, self.platinum, self.quantity, self.visible, self.mod_ranks, self.users, self.statuses
+        )))
+
+    def is_type(self, order_type: str) -> np.ndarray:
+        return self.order_types == ORDER_TYPES.index(order_type)
+
+    def has_status(self, *statuses: str) -> np.ndarray:
+        return np.isin(self.statuses, [USER_STATUSES.index(status) for status in statuses])
+
+    def to_frame(self):
+        """Columns as a pandas DataFrame; numeric columns are handed over without copying."""
+        import pandas as pd
+
+        return pd.DataFrame({
+            'order_id': self.ids,
+            'item_id': self.item_ids,
+            'order_type': pd.Categorical.from_codes(self.order_types, ORDER_TYPES),
+            'platinum': self.platinum,
+            'quantity': self.quantity,
+            'visible': self.visible,
+            'mod_rank': self.mod_ranks,
+            'user': self.users,
+            'status': pd.Categorical.from_codes(self.statuses, USER_STATUSES),
+        }, copy=False)
@@ -0,0 +1,207 @@
+"""
+Compiled, memory-mapped reference data tables.
+
+File layout: an 8 byte magic, a little-endian uint32 header length, a JSON header describing the columns
+and then the column arrays, each aligned to 8 bytes. String columns are stored as a uint32 offsets array
+plus a utf-8 blob. Files are replaced atomically, so readers always map a complete table and can cheaply
+check whether a newer one was published with `is_stale()`.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections import namedtuple
+from collections.abc import Mapping
+
+import numpy as np
+
+MAGIC = b'WFMREF01'
+FORMAT_VERSION = 1
+_HEADER_LENGTH = struct.Struct('<I')
+_ALIGNMENT = 8
+
+
+def payload_version(payload) -> str:
+    """Content stamp of an API payload, used to tell whether a compiled table is up to date."""
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def _encode_strings(values) -> tuple:
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def write_table(path: str, columns: dict, version: str) -> None:
+    """Atomically write columns (numpy arrays or lists of str) to path."""
+    arrays = {}
+    for name, values in columns.items():
+        if isinstance(values, np.ndarray):
+            arrays[name] = values
+        else:
+            arrays[f'{name}.offsets'], arrays[f'{name}.data'] = _encode_strings(values)
+    rows = len(next(iter(columns.values()))) if columns else 0
+
+    # The header stores absolute offsets, so lay the columns out against a header of stable size first
+    layout = {name: {'dtype': array.dtype.str, 'count': int(array.size), 'offset': 0} for name, array in arrays.items()}
+    header = {'format': FORMAT_VERSION, 'version': version, 'created': time.time(), 'rows': rows, 'columns': layout}
+    while True:
+        offset = len(MAGIC) + _HEADER_LENGTH.size + len(json.dumps(header).encode('utf-8'))
+        changed = False
+        for name, array in arrays.items():
+            offset += -offset % _ALIGNMENT
+            if layout[name]['offset'] != offset:
+                layout[name]['offset'] = offset
+                changed = True
+            offset += array.nbytes
+        if not changed:
+            break
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            file.write(MAGIC)
+            file.write(_HEADER_LENGTH.pack(len(header_bytes)))
+            file.write(header_bytes)
+            for name, array in arrays.items():
+                file.write(b'\0' * (layout[name]['offset'] - file.tell()))
+                file.write(np.ascontiguousarray(array).tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class StringColumn:
+    """Lazily decoded view of a string column."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return self._data[self._offsets[index]:self._offsets[index + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+
+class ReferenceTable:
+    """A compiled table mapped read-only into memory; the pages are shared by every process mapping the same file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._stat = os.fstat(file.fileno())
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not a compiled reference data table')
+        header_start = len(MAGIC) + _HEADER_LENGTH.size
+        header_length, = _HEADER_LENGTH.unpack_from(self._mmap, len(MAGIC))
+        header = json.loads(self._mmap[header_start:header_start + header_length])
+        if header['format'] != FORMAT_VERSION:
+            raise ValueError(f'{path} uses reference data format {header["format"]}, expected {FORMAT_VERSION}')
+
+        self.version = header['version']
+        self.created = header['created']
+        self.rows = header['rows']
+        self._columns = header['columns']
+
+    def is_stale(self) -> bool:
+        """Whether a newer table has been published at path since this one was mapped."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns) != (self._stat.st_ino, self._stat.st_mtime_ns)
+
+    def has_column(self, name: str) -> bool:
+        return name in self._columns or f'{name}.offsets' in self._columns
+
+    def array(self, name: str) -> np.ndarray:
+        column = self._columns[name]
+        return np.frombuffer(self._mmap, dtype=np.dtype(column['dtype']), count=column['count'], offset=column['offset'])
+
+    def strings(self, name: str) -> StringColumn:
+        return StringColumn(self.array(f'{name}.offsets'), self.array(f'{name}.data'))
+
+
+_ItemNamesState = namedtuple('_ItemNamesState', ['table', 'ids', 'url_names'])
+
+
+class ItemNames(Mapping):
+    """
+    Read-only id -> url_name mapping over a compiled item table, looked up by binary search on the sorted ids.
+    The table and its columns are swapped as one snapshot, so lookups racing a rebind never mix two tables.
+    """
+
+    def __init__(self, table: ReferenceTable):
+        self.rebind(table)
+
+    @property
+    def table(self) -> ReferenceTable:
+        return self._state.table
+
+    def rebind(self, table: ReferenceTable) -> None:
+        """Switch to a newly compiled table in place, so every holder of this mapping sees the new data."""
+        self._state = _ItemNamesState(table, table.array('id'), table.strings('url_name'))
+
+    @staticmethod
+    def _position(state: _ItemNamesState, item_id: str) -> int:
+        try:
+            key = item_id.encode('ascii') if isinstance(item_id, str) else item_id
+        except UnicodeEncodeError:
+            # Ids are ascii, so this can't be one
+            return -1
+        position = int(np.searchsorted(state.ids, key))
+        if position < len(state.ids) and state.ids[position] == key:
+            return position
+        return -1
+
+    def __getitem__(self, item_id: str) -> str:
+        state = self._state
+        position = self._position(state, item_id)
+        if position < 0:
+            raise KeyError(item_id)
+        return state.url_names[position]
+
+    def __contains__(self, item_id) -> bool:
+        return isinstance(item_id, (str, bytes)) and self._position(self._state, item_id) >= 0
+
+    def __iter__(self):
+        return (item_id.decode('ascii') for item_id in self._state.ids)
+
+    def __len__(self) -> int:
+        return len(self._state.ids)
+
+
+def compile_item_data(path: str, items: list, version: str) -> None:
+    """Compile the `items.en` list of the items endpoint into an item table sorted by id."""
+    items = sorted(items, key=lambda item: item['id'])
+    write_table(path, {
+        'id': np.array([item['id'].encode('ascii') for item in items], dtype=bytes),
+        'url_name': [item['url_name'] for item in items],
+        'item_name': [item.get('item_name') or item['url_name'] for item in items],
+    }, version)
+
+
+def compile_ducat_data(path: str, ducat_rows: list, version: str) -> None:
+    """Compile the `previous_hour` list of the ducats endpoint into a ducat table sorted by dpp, best first."""
+    ducat_rows = sorted(ducat_rows, key=lambda row: row['ducats_per_platinum_wa'], reverse=True)
+    write_table(path, {
+        'id': np.array([row['item'].encode('ascii') for row in ducat_rows], dtype=bytes),
+        'ducats': np.array([row['ducats'] for row in ducat_rows], dtype='<i4'),
+        'dpp': np.array([row['ducats_per_platinum_wa'] for row in ducat_rows], dtype='<f8'),
+    }, version)
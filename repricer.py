@@ -0,0 +1,126 @@
+"""
+Automatic repricing of a user's listings against the live order books.
+
+The user's orders and the competing orders of every listed item are loaded into OrderTables, the best competing price of
+every (item, mod rank) is found with one groupby, and targets are computed for all listings at once. Only listings whose
+target differs from their current price by at least min_change are sent to Market.reprice_orders.
+"""
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+import utility
+from models import logger
+from records import ORDER_TYPES, OrderTable
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class RepriceRules:
+    """
+    undercut is the step below the cheapest competing sell order (above the highest buy order for buy listings).
+    floor and ceiling bound the target, either one price for every listing or a dict of prices by item url_name or id.
+    Only visible orders of users in statuses count as competition, never the user's own; without competition a listing
+    keeps its price. raise_prices=False only ever lowers sell and raises buy listings.
+    """
+
+    def __init__(self, undercut: int = 1, floor=None, ceiling=None, statuses: tuple = ('ingame', 'online'),
+                 order_types: tuple = ('sell', 'buy'), min_change: int = 1, raise_prices: bool = True):
+        self.undercut = undercut
+        self.floor = floor
+        self.ceiling = ceiling
+        self.statuses = tuple(statuses)
+        self.order_types = tuple(order_types)
+        self.min_change = min_change
+        self.raise_prices = raise_prices
+
+
+def _limits(limit, url_names: np.ndarray, item_ids: np.ndarray, default: float) -> np.ndarray:
+    """Per listing float array of a scalar or per item limit, default where an item has none."""
+    if limit is None:
+        return np.full(len(url_names), default)
+    if not isinstance(limit, dict):
+        return np.full(len(url_names), float(limit))
+    return np.array([limit.get(url_name, limit.get(item_id, default)) for url_name, item_id in zip(url_names, item_ids)], dtype=float)
+
+
+class Repricer:
+    def __init__(self, market, rules: RepriceRules = None, concurrency: int = 8):
+        self.market = market
+        self.rules = rules or RepriceRules()
+        self.concurrency = concurrency
+
+    def _listings(self):
+        orders_json = self.market.user.get_orders()
+        orders = [order for order_type in self.rules.order_types for order in orders_json.get(f'{order_type}_orders', [])]
+        item_data = self.market.item_data
+        url_names = np.array([order['item'].get('url_name') or item_data.get(order['item']['id']) for order in orders], dtype=object)
+        return OrderTable.from_orders(orders), url_names
+
+    def _competition(self, items: dict) -> 'pd.DataFrame':
+        """Best competing sell (min) and buy (max) price per item id and mod rank, items maps url_name to item id."""
+        import pandas as pd
+
+        tables = []
+        for url_name, payload, exception in utility.map_concurrently(self.market.get_item_orders, items, self.concurrency):
+            if exception is not None or not payload:
+                logger.warning('Could not get orders for %s: %s', url_name, exception)
+                continue
+            tables.append(OrderTable.from_orders(payload['orders'], items[url_name]))
+
+        orders = OrderTable.concat(tables)
+        orders = orders.take(orders.visible & orders.has_status(*self.rules.statuses) & (orders.users != self.market.user.username))
+        frame = pd.DataFrame({
+            'item_id': orders.item_ids,
+            'mod_rank': orders.mod_ranks,
+            'sell': np.where(orders.is_type('sell'), orders.platinum, np.nan),
+            'buy': np.where(orders.is_type('buy'), orders.platinum, np.nan),
+        })
+        return frame.groupby(['item_id', 'mod_rank'], sort=False).agg(best_sell=('sell', 'min'), best_buy=('buy', 'max'))
+
+    def plan(self) -> 'pd.DataFrame':
+        """
+        One row per listing: order_id, item, order_type, mod_rank, quantity, platinum, best (competing price, NaN without
+        competition), target and change (whether it needs a PUT). This is the dry-run diff.
+        """
+        import pandas as pd
+
+        listings, url_names = self._listings()
+        items = {url_name: item_id for url_name, item_id in zip(url_names, listings.item_ids) if url_name is not None}
+        competition = self._competition(items)
+
+        keys = pd.MultiIndex.from_arrays([listings.item_ids, listings.mod_ranks])
+        best = competition.reindex(keys)
+        selling = listings.is_type('sell')
+        rules = self.rules
+        current = listings.platinum.astype(float)
+        best_price = np.where(selling, best['best_sell'].to_numpy(), best['best_buy'].to_numpy())
+        target = np.where(selling, best_price - rules.undercut, best_price + rules.undercut)
+        target = np.where(np.isnan(target), current, target)
+        if not rules.raise_prices:
+            target = np.where(selling, np.minimum(target, current), np.maximum(target, current))
+        target = np.clip(target, _limits(rules.floor, url_names, listings.item_ids, 1), _limits(rules.ceiling, url_names, listings.item_ids, np.inf))
+        target = np.maximum(np.floor(target), 1).astype(np.int64)
+
+        return pd.DataFrame({
+            'order_id': listings.ids,
+            'item': url_names,
+            'order_type': np.asarray(ORDER_TYPES, dtype=object)[listings.order_types],
+            'mod_rank': listings.mod_ranks,
+            'quantity': listings.quantity,
+            'platinum': listings.platinum,
+            'best': best_price,
+            'target': target,
+            'change': np.abs(target - listings.platinum) >= max(rules.min_change, 1),
+        })
+
+    def apply(self, plan: 'pd.DataFrame' = None) -> list:
+        """Reprice the listings marked for change in plan (a fresh one if None), returning Market.reprice_orders' BatchResults."""
+        if plan is None:
+            plan = self.plan()
+        changes = plan[plan['change'].to_numpy()]
+        logger.info('Repricing %s of %s listings', len(changes), len(plan))
+        if changes.empty:
+            return []
+        return self.market.reprice_orders(dict(zip(changes['order_id'], changes['target'].astype(int).tolist())), self.concurrency)
@@ -0,0 +1,154 @@
+"""
+Full catalogue scans sharded across processes.
+
+The parent splits the item list into shards and hands them to a process pool. Every worker builds its own Market
+(with its own pooled session, rate limiter and lazily loaded reference data) once, fetches the order books of a shard
+with a few threads, reduces each book to one SCAN_DTYPE row and sends the shard back as the raw bytes of a numpy
+structured array, so nothing but a small bytes object crosses the process boundary.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator
+
+import numpy as np
+
+import ratelimit
+import utility
+from models import WarframeMarketCore, logger
+
+SCAN_DTYPE = np.dtype([
+    ('item', '<i4'),  # position of the item in the scanned list
+    ('best_sell', '<i4'),
+    ('best_buy', '<i4'),
+    ('sell_orders', '<i4'),
+    ('buy_orders', '<i4'),
+    ('sell_quantity', '<i4'),
+    ('median_sell', '<f4'),
+])
+
+_worker = None
+
+
+def summarize_orders(orders: list, statuses: tuple) -> tuple:
+    """(best_sell, best_buy, sell_orders, buy_orders, sell_quantity, median_sell) of the visible orders by users in statuses, -1/NaN when a side is empty."""
+    from records import OrderTable
+
+    table = OrderTable.from_orders(orders)
+    live = table.visible & table.has_status(*statuses)
+    sells = table.platinum[live & table.is_type('sell')]
+    buys = table.platinum[live & table.is_type('buy')]
+    return (
+        int(sells.min()) if len(sells) else -1,
+        int(buys.max()) if len(buys) else -1,
+        len(sells),
+        len(buys),
+        int(table.quantity[live & table.is_type('sell')].sum()),
+        float(np.median(sells)) if len(sells) else np.nan,
+    )
+
+
+def _init_worker(config: dict) -> None:
+    global _worker
+    from Market import Market
+    from User import User
+
+    WarframeMarketCore.market_url = config['market_url']
+    WarframeMarketCore.ws_url = config['ws_url']
+    WarframeMarketCore.secret = config['secret']
+    if config['budget'] is not None:
+        rates = {family: config['budget'] for family in ratelimit.RateLimiter.default_rates}
+        WarframeMarketCore.rate_limiter = ratelimit.RateLimiter(rates, default_rate=config['budget'])
+    elif config['rates'] is not None:
+        # The parent's limits split between the workers, so together they stay within them
+        rates, default_rate, burst, *retry_policy = config['rates']
+        share = 1 / config['processes']
+        rates = {family: rate * share for family, rate in rates.items()}
+        burst = None if burst is None else max(1.0, burst * share)
+        WarframeMarketCore.rate_limiter = ratelimit.RateLimiter(rates, default_rate * share, burst, *retry_policy)
+    user = User(config['username'], config['platform'], config['region'])
+    _worker = (Market(user), config['concurrency'], config['statuses'])
+
+
+def _scan_shard(shard: list) -> tuple:
+    """Scan (position, item) pairs in a worker and return (rows as bytes, failed items)."""
+    market, concurrency, statuses = _worker
+    rows = np.empty(len(shard), dtype=SCAN_DTYPE)
+    failed = []
+    count = 0
+    for (position, item), payload, exception in utility.map_concurrently(lambda pair: market.get_item_orders(pair[1]), shard, concurrency):
+        if exception is not None or not payload:
+            failed.append(item)
+            continue
+        rows[count] = (position,) + summarize_orders(payload['orders'], statuses)
+        count += 1
+    return rows[:count].tobytes(), failed
+
+
+class CatalogueScanner:
+    """
+    Scans the order books of many items with a process pool. budget is the request rate of every worker (None splits the
+    parent's rate limits evenly between the workers), concurrency the number of requests a worker keeps in flight.
+    """
+
+    def __init__(self, market, items: list = None, processes: int = None, shard_size: int = 32, concurrency: int = 4,
+                 budget: float = None, statuses: tuple = ('ingame', 'online'), mp_context=None):
+        self.market = market
+        self.items = list(items) if items is not None else list(market.item_data.values())
+        self.processes = processes or os.cpu_count() or 1
+        self.shard_size = shard_size
+        self.concurrency = concurrency
+        self.budget = budget
+        self.statuses = tuple(statuses)
+        self.mp_context = mp_context
+        self.failed = []
+
+    def _config(self) -> dict:
+        user = self.market.user
+        limiter = self.market.rate_limiter
+        return {
+            'secret': self.market._get_secret(),
+            'market_url': self.market.market_url,
+            'ws_url': self.market.ws_url,
+            'username': user.username,
+            'platform': user.platform,
+            'region': user.region,
+            'budget': self.budget,
+            'processes': self.processes,
+            'rates': (limiter.rates, limiter.default_rate, limiter.burst, limiter.max_retries, limiter.backoff_base, limiter.backoff_cap)
+            if limiter is not None else None,
+            'concurrency': self.concurrency,
+            'statuses': self.statuses,
+        }
+
+    def shards(self) -> list:
+        pairs = list(enumerate(self.items))
+        # Small scans still give every worker a shard, idle workers would leave their share of the rate limits unused
+        size = max(1, min(self.shard_size, -(-len(pairs) // self.processes)))
+        return [pairs[start:start + size] for start in range(0, len(pairs), size)]
+
+    def scan(self) -> Iterator[np.ndarray]:
+        """Yield a SCAN_DTYPE array per shard as shards complete; items that failed are collected in `failed`."""
+        self.failed = []
+        context = self.mp_context
+        if isinstance(context, str):
+            context = multiprocessing.get_context(context)
+        with ProcessPoolExecutor(self.processes, mp_context=context, initializer=_init_worker, initargs=(self._config(),)) as executor:
+            futures = [executor.submit(_scan_shard, shard) for shard in self.shards()]
+            for future in as_completed(futures):
+                rows, failed = future.result()
+                if failed:
+                    logger.warning('Could not scan %d items: %s', len(failed), ', '.join(failed[:10]))
+                    self.failed.extend(failed)
+                yield np.frombuffer(rows, dtype=SCAN_DTYPE)
+
+    def to_frame(self):
+        """Run the scan and return one row per scanned item, in the order of `items`."""
+        import pandas as pd
+
+        rows = np.concatenate(list(self.scan()) or [np.empty(0, dtype=SCAN_DTYPE)])
+        rows = rows[np.argsort(rows['item'], kind='stable')]
+        frame = pd.DataFrame({name: rows[name] for name in SCAN_DTYPE.names if name != 'item'})
+        frame.insert(0, 'item', np.asarray(self.items, dtype=object)[rows['item']])
+        frame['spread'] = np.where((frame['best_sell'] >= 0) & (frame['best_buy'] >= 0), frame['best_sell'] - frame['best_buy'], -1)
+        return frame
@@ -0,0 +1,237 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Callable, Iterable
+
+import ratelimit
+from models import logger
+
+ItemStats = namedtuple('ItemStats', ['item', 'polls', 'failures', 'interval', 'age', 'price', 'change_rate', 'activity'])
+
+
+def order_observation(payload: dict, previous_poll: float) -> tuple:
+    """(price, activity) of an item orders payload: the best online sell price and the orders updated per hour since the previous poll."""
+    prices = [order['platinum'] for order in payload['orders']
+              if order['order_type'] == 'sell' and (order.get('user') or {}).get('status') in ('ingame', 'online')]
+    activity = 0
+    if previous_poll is not None:
+        for order in payload['orders']:
+            last_update = order.get('last_update')
+            if last_update and datetime.fromisoformat(last_update).timestamp() > previous_poll:
+                activity += 1
+        activity /= max(time.time() - previous_poll, 1.0) / 3600
+    return (min(prices) if prices else None), activity
+
+
+def statistics_observation(payload: dict, previous_poll: float) -> tuple:
+    """(price, activity) of an item statistics payload: the latest hourly median and the hourly traded volume over the last 48 hours."""
+    hours = payload.get('statistics_closed', {}).get('48hours') or []
+    if not hours:
+        return None, 0
+    return hours[-1].get('median'), sum(hour.get('volume') or 0 for hour in hours) / 48
+
+
+class _ItemState:
+    __slots__ = ('item', 'due', 'interval', 'weight', 'polls', 'failures', 'last_poll', 'price', 'change_rate', 'activity')
+
+    def __init__(self, item: str, interval: float):
+        self.item = item
+        self.due = 0.0
+        self.interval = interval
+        self.weight = 0.0
+        self.polls = 0
+        self.failures = 0
+        self.last_poll = None
+        self.price = None
+        self.change_rate = 0.0
+        self.activity = 0.0
+
+
+class PollScheduler:
+    """
+    Polls items through a Market getter within a global request budget, refreshing items that move more often.
+
+    Items wait in a heap keyed on their next due time. After every poll an item's relative price change rate (per hour) and
+    activity (orders updated per hour, or hourly traded volume for statistics) are folded into moving averages, and the budget
+    (requests per second) is split between items in proportion to the square root of change_rate * (1 + activity),
+    which minimises the total expected price drift for a fixed number of requests. Intervals stay within [min_interval, max_interval].
+    Payloads are passed to the listeners, on the worker threads.
+    """
+
+    def __init__(self, market, items: Iterable[str] = None, budget: float = 1.0, source: str = 'orders', min_interval: float = 30.0,
+                 max_interval: float = 3600.0, smoothing: float = 0.3, workers: int = 2, observe: Callable = None):
+        self.market = market
+        self.budget = budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.smoothing = smoothing
+        self.workers = workers
+        if source == 'orders':
+            self._fetch, self._observe = market.get_item_orders, observe or order_observation
+        elif source == 'statistics':
+            self._fetch, self._observe = market.get_item_statistics, observe or statistics_observation
+        else:
+            raise ValueError(f'Unknown source {source}, expected orders or statistics')
+        self._bucket = ratelimit.TokenBucket(budget)
+        self._states = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._total_weight = 0.0
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._threads = []
+        self._listeners = []
+        self.add_items(items if items is not None else market.item_data.values())
+
+    def add_items(self, items: Iterable[str]) -> None:
+        """Track more items, polled as soon as the budget allows."""
+        now = time.monotonic()
+        with self._condition:
+            for item in items:
+                if item not in self._states:
+                    state = self._states[item] = _ItemState(item, self.max_interval)
+                    self._schedule(state, now)
+            self._condition.notify_all()
+
+    def remove_items(self, items: Iterable[str]) -> None:
+        with self._condition:
+            for item in items:
+                state = self._states.pop(item, None)
+                if state is not None:
+                    self._total_weight -= state.weight
+
+    def add_listener(self, callback: Callable) -> None:
+        """Call callback(item, payload) after every successful poll."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable) -> None:
+        self._listeners.remove(callback)
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self) -> 'PollScheduler':
+        if self.running:
+            return self
+        self._stopped.clear()
+        self._threads = [threading.Thread(target=self._run, name=f'poll-scheduler-{index}', daemon=True) for index in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout: float = None) -> None:
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+
+    def stats(self) -> list:
+        """ItemStats of every tracked item, the stalest first. age is None for items not polled yet."""
+        now = time.time()
+        with self._condition:
+            stats = [ItemStats(state.item, state.polls, state.failures, state.interval,
+                               None if state.last_poll is None else now - state.last_poll,
+                               state.price, state.change_rate, state.activity) for state in self._states.values()]
+        return sorted(stats, key=lambda stat: -math.inf if stat.age is None else -stat.age)
+
+    def item_stats(self, item: str) -> ItemStats:
+        return next(stat for stat in self.stats() if stat.item == item)
+
+    def _schedule(self, state: _ItemState, due: float) -> None:
+        state.due = due
+        heapq.heappush(self._heap, (due, next(self._sequence), state))
+
+    def _next(self) -> _ItemState:
+        """Pop the next due item, waiting until it is due. Returns None once stopped."""
+        with self._condition:
+            while not self._stopped.is_set():
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                due, _, state = self._heap[0]
+                if self._states.get(state.item) is not state or due != state.due:
+                    # Removed item or an entry superseded by a reschedule
+                    heapq.heappop(self._heap)
+                    continue
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._heap)
+                return state
+        return None
+
+    def _run(self) -> None:
+        while True:
+            state = self._next()
+            if state is None:
+                return
+            wait = self._bucket.reserve()
+            if wait > 0 and self._stopped.wait(wait):
+                return
+
+            polled_at = time.time()
+            try:
+                payload = self._fetch(state.item)
+            except Exception as exc:
+                payload = None
+                logger.warning('Polling %s failed: %s', state.item, exc)
+            if not self._update(state, payload, polled_at):
+                continue
+            for callback in list(self._listeners):
+                try:
+                    callback(state.item, payload)
+                except Exception:
+                    logger.exception('Poll listener %r failed', callback)
+
+    def _update(self, state: _ItemState, payload: dict, polled_at: float) -> bool:
+        """Fold a poll into the item's state and reschedule it, returns False when the poll failed or couldn't be observed."""
+        with self._condition:
+            observation = None
+            if payload is not None:
+                try:
+                    observation = self._observe(payload, state.last_poll)
+                except Exception:
+                    logger.exception('Observing the poll of %s failed', state.item)
+            if observation is None:
+                state.failures += 1
+                if state.item in self._states:
+                    self._schedule(state, time.monotonic() + state.interval)
+                    self._condition.notify()
+                return False
+
+            price, activity = observation
+            if state.last_poll is not None:
+                elapsed_hours = max(polled_at - state.last_poll, 1e-3) / 3600
+                change = abs(price - state.price) / state.price / elapsed_hours if price and state.price else 0.0
+                state.change_rate += self.smoothing * (change - state.change_rate)
+            state.activity += self.smoothing * (activity - state.activity)
+            state.polls += 1
+            state.last_poll = polled_at
+            if price is not None:
+                state.price = price
+
+            weight = math.sqrt(state.change_rate * (1 + state.activity))
+            self._total_weight += weight - state.weight
+            state.weight = weight
+            state.interval = self._interval(state)
+            if state.item in self._states:
+                self._schedule(state, time.monotonic() + state.interval)
+                self._condition.notify()
+            return True
+
+    def _interval(self, state: _ItemState) -> float:
+        if state.polls < 2 or self._total_weight <= 0:
+            # Not enough observations yet: share the budget evenly
+            share = self.budget / max(1, len(self._states))
+        else:
+            share = self.budget * state.weight / self._total_weight
+        return min(self.max_interval, max(self.min_interval, 1 / share if share > 0 else self.max_interval))
@@ -0,0 +1,100 @@
+"""
+Coalescing of identical in-flight GETs: the first caller fetches, concurrent callers with the same key wait and share its response.
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Hashable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import decoding
+
+
+def normalize_url(url: str) -> str:
+    """Lowercase scheme and host, drop a trailing slash and sort the query, so equivalent URLs share a flight."""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/') or '/', query, ''))
+
+
+def flight_key(url: str, headers: dict) -> tuple:
+    return normalize_url(url), tuple(sorted((name.lower(), str(value)) for name, value in headers.items()))
+
+
+class SharedResponse:
+    """
+    Response handed to every caller of a coalesced GET. The extracted payload is decoded once and shared,
+    like CachedResponse, so callers must not mutate it.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self._decoded = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str):
+        return getattr(self.response, name)
+
+    def extract(self) -> tuple:
+        if self._decoded is None:
+            with self._lock:
+                if self._decoded is None:
+                    extract = getattr(self.response, 'extract', None)
+                    self._decoded = extract() if extract is not None else decoding.extract(self.response.content)
+        return self._decoded
+
+
+class SingleFlight:
+    """Thread-based coalescing: do() returns (result, shared), shared being True for callers that waited on another's call."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable) -> tuple:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result(), True
+
+        try:
+            result = function()
+        except BaseException as exc:
+            call.set_exception(exc)
+            raise
+        else:
+            call.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return result, False
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    asyncio coalescing, per event loop. The fetch runs as its own task which callers await through a shield,
+    so a cancelled caller (even the first one) doesn't cancel the request for the others.
+    """
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable]) -> tuple:
+        loop = asyncio.get_running_loop()
+        calls = self._calls.setdefault(loop, {})
+        task = calls.get(key)
+        shared = task is not None
+        if not shared:
+            task = calls[key] = loop.create_task(function())
+            task.add_done_callback(lambda done: calls.pop(key, None) if calls.get(key) is done else None)
+        return await asyncio.shield(task), shared
+
+    def in_flight(self) -> int:
+        return sum(len(calls) for calls in list(self._calls.values()))
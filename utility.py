@@ -1,28 +1,88 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Iterator, Tuple
 
 
-def create_logger(name: str = 'main.log', level: int = logging.INFO) -> logging.Logger:
-    logger = logging.getLogger(__name__)
+LOGGER_NAME = 'warframe_market'
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def get_logger() -> logging.Logger:
+    """Return the library logger. It only has a NullHandler until the application configures logging (or calls create_logger)."""
+    logger = logging.getLogger(LOGGER_NAME)
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+    return logger
+
+
+def create_logger(name: str = 'main.log', level: int = logging.INFO, mode: str = 'a') -> logging.Logger:
+    """
+    Opt-in file logging. Records are put on a queue by the calling thread and written by a QueueListener thread,
+    so requests never wait for the disk. name may contain {pid} to give every process its own file.
+    """
+    global _listener
+    logger = get_logger()
     logger.setLevel(level)
 
-    # create a file handler
-    handler = logging.FileHandler(name, mode='w+')
+    # create a file handler, opened on the first record
+    handler = logging.FileHandler(name.format(pid=os.getpid()), mode=mode, delay=True)
     handler.setLevel(level)
 
     # create a logging format
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    formatter = logging.Formatter('%(asctime)s - %(process)d - %(levelname)s - %(message)s')
     handler.setFormatter(formatter)
 
-    # add the handlers to the logger
-    logger.addHandler(handler)
+    with _listener_lock:
+        stop_logging()
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+        _listener.start()
+        for old_handler in list(logger.handlers):
+            if isinstance(old_handler, (logging.NullHandler, logging.handlers.QueueHandler)):
+                logger.removeHandler(old_handler)
+        logger.addHandler(logging.handlers.QueueHandler(records))
 
-    logger.info(f'Logger {name} initialized')
+    logger.info('Logger %s initialized', name)
 
     return logger
 
 
+def stop_logging() -> None:
+    """Flush the queued records and stop the listener thread started by create_logger."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        logger = logging.getLogger(LOGGER_NAME)
+        for handler in list(logger.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                logger.removeHandler(handler)
+        get_logger()
+
+
+atexit.register(stop_logging)
+
+
 def validate_logger(logger: logging.Logger) -> logging.Logger:
     if logger is None:
-        return create_logger('main.log', logging.INFO)
+        return get_logger()
     else:
         return logger
+
+
+def map_concurrently(func: Callable, args: Iterable, max_workers: int = 8) -> Iterator[Tuple]:
+    """Run func over args in a thread pool and yield (arg, result, exception) tuples as the calls complete."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(func, arg): arg for arg in args}
+        for future in as_completed(futures):
+            exception = future.exception()
+            yield futures[future], None if exception is not None else future.result(), exception
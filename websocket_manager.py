@@ -0,0 +1,209 @@
+import json
+import queue
+import random
+import threading
+from typing import Callable
+
+import websocket
+
+from models import logger
+
+WS_URL = 'wss://warframe.market/socket'
+ONLINE_COUNT = '@WS/MESSAGE/ONLINE_COUNT'
+SET_STATUS = '@WS/USER/SET_STATUS'
+
+_MISSING = object()
+
+
+class WebSocketManager:
+    """
+    One long-lived websocket connection, reconnected with exponential backoff and kept alive with pings.
+    Outbound messages are queued while disconnected and inbound JSON messages are dispatched by their `type`.
+    """
+
+    _managers = {}
+    _managers_lock = threading.Lock()
+
+    def __init__(self, url: str, header_provider: Callable = None, heartbeat_interval: float = 25.0, max_backoff: float = 60.0, timeout: float = 30.0):
+        self.url = url
+        self.header_provider = header_provider
+        self.heartbeat_interval = heartbeat_interval
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._handlers = {}
+        self._connect_handlers = []
+        self._latest = {}
+        self._outbox = queue.Queue()
+        self._condition = threading.Condition()
+        self._connection = None
+        self._send_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def for_platform(cls, platform: str, header_provider: Callable = None, url: str = WS_URL) -> 'WebSocketManager':
+        """Return the shared, started manager of a platform."""
+        key = (url, platform)
+        with cls._managers_lock:
+            manager = cls._managers.get(key)
+            if manager is None:
+                manager = cls(f'{url}?platform={platform}', header_provider)
+                manager.start()
+                cls._managers[key] = manager
+        return manager
+
+    @classmethod
+    def close_all(cls) -> None:
+        with cls._managers_lock:
+            managers, cls._managers = list(cls._managers.values()), {}
+        for manager in managers:
+            manager.close()
+
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name=f'ws-{self.url}', daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        self._stopped.set()
+        connection = self._connection
+        if connection is not None:
+            connection.close()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(self.timeout)
+
+    def on(self, message_type: str, handler: Callable) -> None:
+        """Call handler(payload) for every inbound message of message_type, '*' receives whole messages of any type."""
+        self._handlers.setdefault(message_type, []).append(handler)
+
+    def off(self, message_type: str, handler: Callable) -> None:
+        self._handlers.get(message_type, []).remove(handler)
+
+    def on_connect(self, handler: Callable) -> None:
+        """Call handler() on the connection thread after every (re)connection, once queued messages are sent."""
+        self._connect_handlers.append(handler)
+
+    def off_connect(self, handler: Callable) -> None:
+        self._connect_handlers.remove(handler)
+
+    def send(self, message_type: str, payload=None) -> None:
+        """Send a message now if connected, otherwise queue it until the connection is (re)established."""
+        message = json.dumps({'type': message_type, 'payload': payload})
+        # Checking the connection and queueing under one lock, so a connection made in between can't miss the message
+        with self._send_lock:
+            if not self._send_locked(message):
+                self._outbox.put(message)
+
+    def wait_for(self, message_type: str, timeout: float = None, latest: bool = True):
+        """Return the payload of the last message of message_type, or block for the next one if none arrived yet (or latest is False)."""
+        with self._condition:
+            if latest and message_type in self._latest:
+                return self._latest[message_type]
+            seen = self._latest.get(message_type, _MISSING)
+            if not self._condition.wait_for(lambda: self._latest.get(message_type, _MISSING) is not seen, timeout or self.timeout):
+                raise TimeoutError(f'No {message_type} message received')
+            return self._latest[message_type]
+
+    def _send_now(self, message: str) -> bool:
+        with self._send_lock:
+            return self._send_locked(message)
+
+    def _send_locked(self, message: str) -> bool:
+        connection = self._connection
+        if connection is None:
+            return False
+        try:
+            connection.send(message)
+            return True
+        except (websocket.WebSocketException, OSError) as exc:
+            logger.warning('Websocket send failed, queueing message: %s', exc)
+            return False
+
+    def _connect(self):
+        headers = self.header_provider() if self.header_provider is not None else []
+        connection = websocket.create_connection(self.url, timeout=self.timeout, header=headers)
+        connection.settimeout(self.heartbeat_interval)
+        return connection
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while not self._stopped.is_set():
+            try:
+                connection = self._connect()
+            except (websocket.WebSocketException, OSError) as exc:
+                delay = random.uniform(backoff / 2, backoff)
+                logger.warning('Websocket connection to %s failed, retrying in %.1fs: %s', self.url, delay, exc)
+                self._stopped.wait(delay)
+                backoff = min(self.max_backoff, backoff * 2)
+                continue
+
+            logger.debug('Websocket connected to %s', self.url)
+            backoff = 1.0
+            with self._send_lock:
+                self._connection = connection
+            self._flush_outbox()
+            for handler in list(self._connect_handlers):
+                try:
+                    handler()
+                except Exception:
+                    logger.exception('Websocket connect handler %r failed', handler)
+            try:
+                self._receive(connection)
+            except (websocket.WebSocketException, OSError) as exc:
+                if not self._stopped.is_set():
+                    logger.warning('Websocket connection to %s lost: %s', self.url, exc)
+            finally:
+                with self._send_lock:
+                    self._connection = None
+                connection.close()
+
+    def _flush_outbox(self) -> None:
+        while True:
+            try:
+                message = self._outbox.get_nowait()
+            except queue.Empty:
+                return
+            if not self._send_now(message):
+                self._outbox.put(message)
+                return
+
+    def _receive(self, connection) -> None:
+        while not self._stopped.is_set():
+            try:
+                raw_message = connection.recv()
+            except websocket.WebSocketTimeoutException:
+                # Idle for a whole heartbeat interval
+                with self._send_lock:
+                    connection.ping()
+                continue
+            if not raw_message:
+                raise websocket.WebSocketConnectionClosedException('Connection closed by the server')
+            self._dispatch(raw_message)
+
+    def _dispatch(self, raw_message) -> None:
+        try:
+            message = json.loads(raw_message)
+        except ValueError:
+            message = None
+        if not isinstance(message, dict):
+            logger.warning('Ignoring a malformed websocket message: %r', raw_message[:200])
+            return
+
+        message_type = message.get('type')
+        payload = message.get('payload')
+        with self._condition:
+            self._latest[message_type] = payload
+            self._condition.notify_all()
+
+        calls = [(handler, payload) for handler in self._handlers.get(message_type, ())]
+        calls.extend((handler, message) for handler in self._handlers.get('*', ()))
+        for handler, argument in calls:
+            try:
+                handler(argument)
+            except Exception:
+                logger.exception('Websocket handler for %s failed', message_type)